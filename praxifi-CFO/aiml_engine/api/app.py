@@ -1,11 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .endpoints import router as api_router
+from aiml_engine.core.data_ingestion import warm_up_header_matcher
+from aiml_engine.core.forecast_pool import start_forecast_pool, shutdown_forecast_pool
+from aiml_engine.utils.helpers import enable_copy_on_write
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pipeline stages share one frame copy-on-write (PANDAS_COPY_ON_WRITE=false opts out)
+    enable_copy_on_write()
+    # Load the shared spaCy model and synonym embedding matrix once per worker,
+    # so the first upload does not pay the model load. A model that cannot be loaded
+    # only disables the NLP tier; uploads are then matched lexically
+    warm_up_header_matcher()
+    # One forecasting pool for the app's lifetime; workers fork from a forkserver
+    # that has imported only the forecasting stack
+    start_forecast_pool()
+    yield
+    shutdown_forecast_pool()
+
 
 app = FastAPI(
     title="Agentic CFO Copilot API",
     description="An autonomous AIML system for financial intelligence, forecasting, and narrative generation.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for production and development
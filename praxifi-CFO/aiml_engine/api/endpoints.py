@@ -1,5 +1,4 @@
 import pandas as pd
-import io
 import os
 import json
 import uuid
@@ -9,14 +8,21 @@ from fastapi import APIRouter, UploadFile, File, HTTPException, Form
 # Use the proven, correct Response object and Python 3.9 Optional
 from starlette.responses import Response 
 from typing import Dict, Any, Optional
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 import multiprocessing
 
 # --- All existing imports are correct and unchanged ---
 from aiml_engine.core.data_ingestion import DataIngestion
 from aiml_engine.core.data_validation import DataValidationQualityAssuranceEngine
-from aiml_engine.core.feature_engineering import KPIAutoExtractionDynamicFeatureEngineering
-from aiml_engine.core.forecasting import ForecastingModule
+from aiml_engine.core.feature_engineering import KPIAutoExtractionDynamicFeatureEngineering, KPI_GRAPH
+from aiml_engine.core.forecasting import COMPOSITE_METRICS, ForecastingModule
+from aiml_engine.core.reconciliation import RECONCILIATION_METHODS
+from aiml_engine.core.frame_handoff import published_frame
+from aiml_engine.core.forecast_pool import SEGMENT_MIN_ACCURACY, forecast_metric, forecast_segment, screen_segment
+from aiml_engine.core.forecast_scheduler import (
+    PRIORITY_CORE, PRIORITY_SECONDARY, PRIORITY_SEGMENT, ForecastJob, ForecastScheduler, ScheduleResult
+)
 # Enhanced anomaly detection with 6-algorithm ensemble
 from aiml_engine.core.anomaly_detection_v2 import AnomalyDetectionModule
 from aiml_engine.core.correlation import CrossMetricCorrelationTrendMiningEngine
@@ -37,7 +43,7 @@ from aiml_engine.core.secure_mpc import ShamirSecretSharing, SecretSharedDataFra
 from aiml_engine.core.zero_knowledge import ZeroKnowledgeProver, DataValidator, create_data_certificate
 from aiml_engine.core.privacy_budget import PrivacyBudgetTracker, get_privacy_budget_tracker, RenyiDPComposer
 # ---
-from aiml_engine.utils.helpers import CustomJSONEncoder, convert_numpy_types
+from aiml_engine.utils.helpers import CustomJSONEncoder, convert_numpy_types, drop_duplicate_periods, merge_sorted_frames
 from dotenv import load_dotenv, find_dotenv
 from sse_starlette.sse import EventSourceResponse
 
@@ -87,6 +93,18 @@ zk_validator = DataValidator()
 privacy_budget_total = float(os.getenv("PRIVACY_BUDGET_PER_SESSION", "10.0"))
 budget_tracker = get_privacy_budget_tracker(total_budget=privacy_budget_total)
 
+# --- BULK UPLOADS: bounded pool for per-file pipelines ---
+bulk_upload_max_workers = int(os.getenv("BULK_UPLOAD_MAX_WORKERS", str(min(8, multiprocessing.cpu_count()))))
+
+# --- SEGMENT FORECASTS: 'batch' forecasts all regions/departments in one vectorized pass,
+# 'prophet' fits one Prophet model per segment in a process pool, 'hierarchical' reconciles
+# total, regions and departments into coherent forecasts (FORECAST_RECONCILIATION) ---
+segment_forecast_engine = os.getenv("SEGMENT_FORECAST_ENGINE", "batch").lower()
+forecast_reconciliation = os.getenv("FORECAST_RECONCILIATION", "mint").lower()
+if forecast_reconciliation not in RECONCILIATION_METHODS:
+    secure_logger.warning(f"⚠️ Unknown FORECAST_RECONCILIATION '{forecast_reconciliation}', using 'mint' (one of {RECONCILIATION_METHODS})")
+    forecast_reconciliation = "mint"
+
 secure_logger.info("🔒 Security layers initialized: Memory Encryption ✓, Secure Logging ✓, HE Ready ✓, SMPC Ready ✓, ZK Proofs ✓, Privacy Budget Tracking ✓")
 
 # ---
@@ -149,127 +167,94 @@ async def get_progress(task_id: str):
     
     return EventSourceResponse(event_generator())
 
-# PARALLEL FORECASTING HELPER
-def _forecast_single_metric(metric: str, df_json: str) -> tuple:
+def _screen_segments(featured_df: pd.DataFrame, segment_col: str, segment_frames: dict, metric: str = 'revenue') -> tuple:
     """
-    Helper function to forecast a single metric in parallel.
-    Takes serialized DataFrame to avoid pickling issues.
-    Returns (metric_name, forecast, model_health)
+    Splits the frame by `segment_col` once (reusing the feature module's partition when it made one)
+    and screens every segment before any forecast is dispatched (see screen_segment).
+    Returns ({segment: frame} worth forecasting, {segment: reason} skipped).
     """
-    try:
-        # Deserialize DataFrame
-        df = pd.read_json(io.StringIO(df_json))
-        
-        # Run forecasting
-        forecasting_module = ForecastingModule(metric=metric)
-        forecast, model_health = forecasting_module.generate_forecast(df)
-        
-        return (metric, forecast, model_health)
-    except Exception as e:
-        # Return empty forecast on failure
-        return (metric, [], {"status": "Failed", "reason": str(e)})
+    frames = segment_frames.get(segment_col) or KPIAutoExtractionDynamicFeatureEngineering.partition_segments(featured_df, segment_col)
+    eligible, skipped = {}, {}
+    for segment, df_segment in frames.items():
+        reason = screen_segment(df_segment, metric)
+        if reason is None:
+            eligible[segment] = df_segment
+        else:
+            skipped[str(segment)] = reason
+    return eligible, skipped
 
-def _forecast_regional_metric(region: str, df_json: str, metric: str = 'revenue') -> tuple:
+def _run_batch_segment_forecasting(featured_df: pd.DataFrame, segment_col: str, segments: list, metric: str = 'revenue') -> dict:
     """
-    Helper function to forecast a single region in parallel.
-    Returns (region_name, forecast, success_flag)
+    Forecasts the screened `segments` of `segment_col` in one vectorized batch
+    (ForecastingModule.generate_batch_forecast), keeping only forecasts that pass the same
+    gates as the per-segment Prophet workers: accuracy >= SEGMENT_MIN_ACCURACY and no negative values.
     """
-    try:
-        df = pd.read_json(io.StringIO(df_json))
-        df_region = df[df['region'] == region].copy()
-        
-        # Require minimum 30 months for regional forecasts (increased for better stability)
-        # Regional data is often noisier than overall metrics
-        if len(df_region) >= 30 and metric in df_region.columns:
-            forecasting_module = ForecastingModule(metric=metric)
-            forecast, model_health = forecasting_module.generate_forecast(df_region)
-            # Only return forecast if it's successful and doesn't have negative values
-            if forecast and model_health.get('status') == 'Success':
-                # Check for unrealistic negative forecasts (revenue shouldn't be negative)
-                has_negative = any(f.get('predicted', 0) < 0 for f in forecast if isinstance(f, dict))
-                # Strict accuracy threshold - regional forecasts must be highly accurate
-                accuracy = model_health.get('accuracy_percentage', 0)
-                if not has_negative and accuracy >= 85:
-                    return (region, forecast, True)
-        return (region, [], False)
-    except Exception as e:
-        return (region, [], False)
+    if not segments:
+        return {}
+
+    forecasts, model_health = ForecastingModule(metric=metric).generate_batch_forecast(
+        featured_df[featured_df[segment_col].isin(segments)], segment_col
+    )
+    return {
+        name: forecast for name, forecast in forecasts.items()
+        if model_health[name].get('status') == 'Success'
+        and model_health[name].get('accuracy_percentage', 0) >= SEGMENT_MIN_ACCURACY
+        and not any(point['predicted'] < 0 for point in forecast)
+    }
 
-def _forecast_departmental_metric(department: str, df_json: str, metric: str = 'revenue') -> tuple:
+# 🔒 SECURE FILE PROCESSING WITH ALL SECURITY LAYERS
+def _read_upload_into_buffer(file: UploadFile) -> bytearray:
     """
-    Helper function to forecast a single department in parallel.
-    Returns (department_name, forecast, success_flag)
+    Reads an upload into a single mutable buffer. A bytearray (unlike bytes) can be
+    overwritten in place by secure_wipe once parsing is done.
     """
-    try:
-        df = pd.read_json(io.StringIO(df_json))
-        df_dept = df[df['department'] == department].copy()
-        
-        # Require minimum 30 months for departmental forecasts (increased for better stability)
-        # Departmental data is often noisier than overall metrics
-        if len(df_dept) >= 30 and metric in df_dept.columns:
-            forecasting_module = ForecastingModule(metric=metric)
-            forecast, model_health = forecasting_module.generate_forecast(df_dept)
-            # Only return forecast if it's successful and doesn't have negative values
-            if forecast and model_health.get('status') == 'Success':
-                # Check for unrealistic negative forecasts (revenue/profit should never be negative)
-                has_negative = any(f.get('predicted', 0) < 0 for f in forecast if isinstance(f, dict))
-                # Strict accuracy threshold - departmental forecasts must be highly accurate
-                accuracy = model_health.get('accuracy_percentage', 0)
-                if not has_negative and accuracy >= 85:
-                    return (department, forecast, True)
-        return (department, [], False)
-    except Exception as e:
-        return (department, [], False)
+    upload = file.file
+    upload.seek(0, os.SEEK_END)
+    size = upload.tell()
+    upload.seek(0)
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    read_total = 0
+    while read_total < size:
+        read_now = upload.readinto(view[read_total:])
+        if not read_now:
+            break
+        read_total += read_now
+    view.release()
+    del buffer[read_total:]
+    return buffer
 
-# 🔒 SECURE FILE PROCESSING WITH ALL SECURITY LAYERS
-def process_uploaded_file(file: UploadFile):
+def process_uploaded_file(file: UploadFile, columnar_corrections_log: bool = False, kpi_targets: list = None):
     """
-    Process uploaded CSV file with maximum security:
-    - NO disk persistence (pure in-memory processing)
-    - Memory encryption (AES-256-GCM)
+    Process uploaded CSV, Parquet or Feather file with maximum security:
+    - NO disk persistence (parsed straight from one in-memory buffer, no temp file)
+    - No intermediate decoded/str copies of the upload
     - Secure logging with PII redaction
     - Zero-knowledge validation
-    - Secure memory wiping after processing
+    - Secure memory wiping after processing (buffer overwritten in place)
+    The corrections log is returned as one dict per corrected cell, or columnar with `columnar_corrections_log`.
+    `kpi_targets` limits feature engineering to those KPIs and their dependencies (default: all).
     """
-    encrypted_content = None
-    csv_data = None
-    temp_file_path = None
+    content = None
     
     try:
-        # LAYER 1: Read and encrypt file content in memory
-        content = file.file.read()
+        # LAYER 1: Read file content into one in-memory buffer
+        content = _read_upload_into_buffer(file)
         secure_logger.audit(
             event_type="file_upload",
             details={"filename": file.filename, "size_bytes": len(content)},
             user_id="api_user"
         )
         
-        # Encrypt raw content in memory
-        nonce, encrypted_content = secure_memory.encrypt(content)
+        # Parse directly from the buffer (the CSV parser decodes in C, chunk by chunk).
+        # Parquet/Feather uploads are detected from the file name or magic bytes.
+        ingestion_module = DataIngestion()
+        normalized_df, header_mappings = ingestion_module.ingest_and_normalize(content, filename=file.filename)
         
-        # Immediately wipe plaintext content from memory
+        # Raw upload is no longer needed - overwrite it before any analytics run
+        # (ingest_and_normalize guarantees the frame does not point into `content`)
         secure_wipe(content)
-        
-        # Decrypt only for processing (minimal plaintext exposure)
-        decrypted_content = secure_memory.decrypt(nonce, encrypted_content)
-        csv_data = io.StringIO(decrypted_content.decode('utf-8'))
-        
-        # Wipe decrypted content
-        secure_wipe(decrypted_content)
-        
-        # CRITICAL FIX: Use in-memory temp file (no disk persistence)
-        # Create a temporary file object that exists only in RAM
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=True) as temp_file:
-            temp_file.write(csv_data.getvalue())
-            temp_file.flush()
-            temp_file_path = temp_file.name
-            
-            # Process while file is in memory
-            ingestion_module = DataIngestion()
-            normalized_df, header_mappings = ingestion_module.ingest_and_normalize(temp_file_path)
-        
-        # Temp file is automatically deleted here (secure deletion by OS)
+        content = None
         
         # LAYER 5: Zero-Knowledge Validation (prove data quality without exposing values)
         if zk_validation_enabled:
@@ -289,7 +274,7 @@ def process_uploaded_file(file: UploadFile):
         validated_df, validation_report, corrections_log = validation_module.run_pipeline(normalized_df, header_mappings)
         
         feature_module = KPIAutoExtractionDynamicFeatureEngineering()
-        featured_df, feature_schema = feature_module.extract_and_derive_features(validated_df)
+        featured_df, feature_schema = feature_module.extract_and_derive_features(validated_df, targets=kpi_targets)
         
         # LAYER 1: Encrypt DataFrame in memory (optional, for extra paranoia)
         # Note: Disabled by default as it impacts performance, enable with env var
@@ -308,10 +293,18 @@ def process_uploaded_file(file: UploadFile):
         
         return { 
             "featured_df": featured_df, 
+            # Per-segment slices (segmented mode only): {"region": {"North": frame, ...}},
+            # plus {("region", "department"): {("North", "Sales"): frame, ...}} for several columns
+            "segment_frames": feature_module.segment_frames,
             "reports": { 
                 "validation_report": validation_report, 
-                "corrections_log": corrections_log, 
-                "feature_schema": feature_schema 
+                "corrections_log": corrections_log.to_columnar() if columnar_corrections_log else corrections_log.to_records(), 
+                "feature_schema": feature_schema,
+                "ingestion_report": {
+                    "numeric_parse_failures": ingestion_module.numeric_parse_failures
+                },
+                "memory_report": feature_module.memory_report,
+                "kpi_timings_ms": feature_module.kpi_timings
             } 
         }
         
@@ -322,73 +315,72 @@ def process_uploaded_file(file: UploadFile):
     
     finally:
         # LAYER 1: Secure memory cleanup (critical for preventing memory dumps)
-        secure_wipe(encrypted_content, csv_data)
-        
-        # Extra paranoid: if temp file somehow still exists, securely delete it
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                # Overwrite file with random data before deletion
-                with open(temp_file_path, 'wb') as f:
-                    f.write(os.urandom(os.path.getsize(temp_file_path)))
-                os.remove(temp_file_path)
-            except:
-                pass
-
-def process_uploaded_files(files: list[UploadFile]):
+        if content is not None:
+            secure_wipe(content)
+
+def process_uploaded_files(files: list[UploadFile], columnar_corrections_log: bool = False):
     """
-    Process multiple uploaded CSV files and merge them into a single dataset.
-    Files are merged chronologically after individual processing.
-    All security layers (encryption, logging, ZK validation) are applied.
+    Process multiple uploaded CSV, Parquet or Feather files and merge them into a single dataset.
+    Each file runs through its own pipeline (ingestion, ZK validation, validation, features)
+    concurrently in a bounded thread pool; the date-sorted results are then k-way merged
+    chronologically. All security layers (encryption, logging, ZK validation) are applied.
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
     
-    secure_logger.info(f"🔀 Processing {len(files)} files for merge")
+    max_workers = max(1, min(bulk_upload_max_workers, len(files)))
+    secure_logger.info(f"🔀 Processing {len(files)} files for merge ({max_workers} workers)")
     
     all_dataframes = []
+    segment_columns = []
     combined_reports = {
         "validation_reports": [],
         "corrections_logs": [],
-        "feature_schemas": []
+        "feature_schemas": [],
+        "ingestion_reports": [],
+        "memory_reports": [],
+        "kpi_timings": []
     }
     
-    # Process each file individually with full security
-    for idx, file in enumerate(files):
-        try:
-            secure_logger.info(f"📄 Processing file {idx + 1}/{len(files)}: {file.filename}")
-            result = process_uploaded_file(file)
-            
-            # Extract the processed DataFrame
-            df = result["featured_df"]
-            
-            # Store the DataFrame and reports
-            all_dataframes.append(df)
-            combined_reports["validation_reports"].append(result["reports"]["validation_report"])
-            combined_reports["corrections_logs"].append(result["reports"]["corrections_log"])
-            combined_reports["feature_schemas"].append(result["reports"]["feature_schema"])
-            
-        except Exception as e:
-            secure_logger.error(f"❌ Failed to process file {file.filename}: {str(e)}")
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Failed to process file '{file.filename}': {str(e)}"
-            )
+    # Process files concurrently with full security; results are collected in upload
+    # order so later files still win on duplicate dates
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bulk_upload") as executor:
+        futures = [executor.submit(process_uploaded_file, file, columnar_corrections_log) for file in files]
+        for idx, (file, future) in enumerate(zip(files, futures)):
+            try:
+                secure_logger.info(f"📄 Collecting file {idx + 1}/{len(files)}: {file.filename}")
+                result = future.result()
+                
+                # Store the DataFrame and reports
+                all_dataframes.append(result["featured_df"])
+                segment_columns.extend(col for col in result["segment_frames"] if col not in segment_columns)
+                combined_reports["validation_reports"].append(result["reports"]["validation_report"])
+                combined_reports["corrections_logs"].append(result["reports"]["corrections_log"])
+                combined_reports["feature_schemas"].append(result["reports"]["feature_schema"])
+                combined_reports["ingestion_reports"].append(result["reports"]["ingestion_report"])
+                combined_reports["memory_reports"].append(result["reports"]["memory_report"])
+                combined_reports["kpi_timings"].append(result["reports"]["kpi_timings_ms"])
+                
+            except Exception as e:
+                for pending in futures:
+                    pending.cancel()
+                secure_logger.error(f"❌ Failed to process file {file.filename}: {str(e)}")
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"Failed to process file '{file.filename}': {str(e)}"
+                )
     
     # Merge all DataFrames chronologically
     try:
         secure_logger.info(f"🔗 Merging {len(all_dataframes)} datasets...")
         
-        # Concatenate all DataFrames
-        merged_df = pd.concat(all_dataframes, ignore_index=True)
-        
-        # Sort by date column if it exists
-        if 'date' in merged_df.columns:
-            merged_df = merged_df.sort_values('date').reset_index(drop=True)
+        # Every featured frame is already date-sorted: k-way merge the runs (stable)
+        merged_df = merge_sorted_frames(all_dataframes, key='date')
         
-        # Remove duplicate rows (same date and values)
-        if 'date' in merged_df.columns:
-            # Keep last occurrence of duplicate dates (assumes later file is more recent/correct)
-            merged_df = merged_df.drop_duplicates(subset=['date'], keep='last').reset_index(drop=True)
+        # Remove duplicate rows (same date within the same region/department/segment): keep the
+        # last occurrence (assumes later file is more recent/correct)
+        segment_keys = ['region', 'department', *(col for col in segment_columns if isinstance(col, str))]
+        merged_df = drop_duplicate_periods(merged_df, segment_keys)
         
         secure_logger.info(f"✅ Successfully merged into {len(merged_df)} rows from {len(files)} files")
         
@@ -402,10 +394,18 @@ def process_uploaded_files(files: list[UploadFile]):
         
         return {
             "featured_df": merged_df,
+            "segment_frames": {
+                col: KPIAutoExtractionDynamicFeatureEngineering.partition_segments(merged_df, col)
+                for col in segment_columns
+                if all(c in merged_df.columns for c in (col if isinstance(col, tuple) else (col,)))
+            },
             "reports": {
                 "validation_report": combined_reports["validation_reports"],
                 "corrections_log": combined_reports["corrections_logs"],
                 "feature_schema": combined_reports["feature_schemas"][0] if combined_reports["feature_schemas"] else {},
+                "ingestion_report": combined_reports["ingestion_reports"],
+                "memory_report": combined_reports["memory_reports"],
+                "kpi_timings_ms": combined_reports["kpi_timings"],
                 "merge_info": {
                     "total_files": len(files),
                     "total_rows": len(merged_df),
@@ -421,74 +421,37 @@ def process_uploaded_files(files: list[UploadFile]):
             detail=f"Failed to merge datasets: {str(e)}"
         )
 
-def _run_parallel_forecasting(df_json: str, all_metrics_to_forecast: list) -> tuple:
-    """
-    Helper function to run parallel forecasting in a separate thread.
-    This prevents blocking the async event loop during CPU-intensive work.
-    """
-    all_forecasts = {}
-    all_model_health = {}
-    
-    # Determine optimal number of workers (use all cores, but cap at metric count)
-    max_workers = min(multiprocessing.cpu_count(), len(all_metrics_to_forecast))
-    
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all forecasting jobs
-        future_to_metric = {
-            executor.submit(_forecast_single_metric, metric, df_json): metric 
-            for metric in all_metrics_to_forecast
-        }
-        
-        # Collect results as they complete
-        for future in as_completed(future_to_metric):
-            metric_name, forecast, model_health = future.result()
-            if forecast:  # Only add successful forecasts
-                all_forecasts[metric_name] = forecast
-                all_model_health[metric_name] = model_health
-    
-    return all_forecasts, all_model_health
+def _deferred_health(metric: str, budget_seconds: Optional[float]) -> dict:
+    return {
+        "forecast_metric": metric,
+        "status": "deferred",
+        "reason": f"Forecast did not finish within the {budget_seconds:g}s forecasting budget"
+    }
 
-def _run_parallel_regional_forecasting(df_json: str, regions: list) -> dict:
+async def _run_within_budget(scheduler: ForecastScheduler, func, *args) -> tuple:
     """
-    Helper function to run parallel regional forecasting in a separate thread.
-    This prevents blocking the async event loop during CPU-intensive work.
+    Runs func(*args) in a thread within what is left of the scheduler's budget.
+    Returns (result, deferred); result is None when the deadline passed first. As with pool
+    jobs, a pass still running at the deadline finishes in the background and is discarded.
     """
-    regional_forecasts = {}
-    region_max_workers = min(len(regions), multiprocessing.cpu_count())
-    
-    with ProcessPoolExecutor(max_workers=region_max_workers) as executor:
-        future_to_region = {
-            executor.submit(_forecast_regional_metric, region, df_json): region 
-            for region in regions
-        }
-        
-        for future in as_completed(future_to_region):
-            region_name, forecast, success = future.result()
-            if success and forecast:
-                regional_forecasts[str(region_name)] = forecast
-    
-    return regional_forecasts
+    remaining = scheduler.remaining_seconds()
+    if remaining == 0:
+        return None, True
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=remaining), False
+    except asyncio.TimeoutError:
+        return None, True
 
-def _run_parallel_departmental_forecasting(df_json: str, departments: list) -> dict:
-    """
-    Helper function to run parallel departmental forecasting in a separate thread.
-    This prevents blocking the async event loop during CPU-intensive work.
-    """
-    dept_forecasts = {}
-    dept_max_workers = min(len(departments), multiprocessing.cpu_count())
-    
-    with ProcessPoolExecutor(max_workers=dept_max_workers) as executor:
-        future_to_dept = {
-            executor.submit(_forecast_departmental_metric, dept, df_json): dept 
-            for dept in departments
-        }
-        
-        for future in as_completed(future_to_dept):
-            dept_name, forecast, success = future.result()
+def _collect_segment_forecasts(schedule: ScheduleResult, segment_col: str) -> tuple:
+    """Successful forecasts and deferred segment names of `segment_col` from a scheduler run."""
+    forecasts = {}
+    for key, result in schedule.results.items():
+        if isinstance(key, tuple) and key[0] == segment_col:
+            segment, forecast, success = result
             if success and forecast:
-                dept_forecasts[str(dept_name)] = forecast
-    
-    return dept_forecasts
+                forecasts[str(segment)] = forecast
+    deferred = [str(key[1]) for key in schedule.deferred if isinstance(key, tuple) and key[0] == segment_col]
+    return forecasts, deferred
 
 # This endpoint is UNTOUCHED. It works perfectly.
 @router.post("/full_report")
@@ -498,7 +461,15 @@ async def get_full_financial_report(
         description="The persona for the agent's narrative generation. Use 'finance_guardian' for internal operational insights, or 'financial_storyteller' for external stakeholder narratives."
     ),
     file: UploadFile = File(None, description="Single file (backward compatibility)"),
-    files: list[UploadFile] = File(None, description="Multiple files for bulk upload")
+    files: list[UploadFile] = File(None, description="Multiple files for bulk upload"),
+    columnar_corrections_log: bool = Form(
+        False,
+        description="Return the corrections log in the compact columnar form ({timestamp, columns: {column: {row_ids, correction, method}}}) instead of one record per corrected cell."
+    ),
+    forecast_budget_seconds: Optional[float] = Form(
+        None,
+        description="Time budget for forecasting in seconds (default: FORECAST_TIME_BUDGET_SECONDS, 0 = no limit). Forecasts still running at the deadline are reported as 'deferred'."
+    )
 ):
     """
     **One-Shot Analysis Endpoint with Bulk Upload Support**
@@ -506,7 +477,7 @@ async def get_full_financial_report(
     This is a powerful endpoint that runs the entire AIML pipeline on CSV file(s) and returns a complete, structured dashboard report.
     It does not have conversational memory. Use this for generating static reports or initial dashboard loads.
     
-    - **Upload CSV file(s)**: Single or multiple files supported. Files will be merged chronologically into one dataset.
+    - **Upload CSV file(s)**: Single or multiple files supported (CSV, Parquet or Feather). Files will be merged chronologically into one dataset.
     - **Receive a full report**: Includes KPIs, 3-month forecasts for all key metrics (revenue, expenses, profit, cashflow, growth_rate), detected anomalies, correlation insights, and narrative summaries.
     - **Choose a persona**: Select `finance_guardian` or `financial_storyteller` to tailor the narrative output.
     """
@@ -531,7 +502,7 @@ async def get_full_financial_report(
     update_progress(task_id, "upload", 5, f"Processing {len(uploaded_files)} uploaded file(s)...")
     
     # Process and merge all uploaded files
-    processing_results = process_uploaded_files(uploaded_files)
+    processing_results = process_uploaded_files(uploaded_files, columnar_corrections_log)
     featured_df = processing_results["featured_df"]
     
     update_progress(task_id, "validation", 15, "Data validated and features engineered")
@@ -554,21 +525,105 @@ async def get_full_financial_report(
         if metric in featured_df.columns:
             all_metrics_to_forecast.append(metric)
     
-    # Serialize DataFrame once for all workers (avoid pickling issues)
-    df_json = featured_df.to_json(date_format='iso')
+    # Ratio KPIs whose components are forecast anyway are computed from those forecasts (no fit of their own)
+    derived_metrics = [
+        metric for metric in all_metrics_to_forecast
+        if ForecastingModule(metric=metric).derives_from(all_metrics_to_forecast)
+    ]
+    
+    segment_columns = [col for col in ('region', 'department') if col in featured_df.columns]
+    hierarchical = segment_forecast_engine == "hierarchical" and bool(segment_columns) and 'revenue' in featured_df.columns
+    scheduler = ForecastScheduler(budget_seconds=forecast_budget_seconds)
+    
+    # Screen regions/departments once in the parent: segments too short or too noisy to pass the
+    # segment gates are skipped instead of fitted and discarded. A hierarchy keeps every segment
+    # so that the parts add up to the total.
+    screened_segments = {
+        segment_col: _screen_segments(featured_df, segment_col, processing_results.get("segment_frames", {}))
+        for segment_col in segment_columns if not hierarchical
+    }
     
-    update_progress(task_id, "forecasting", 25, f"Running parallel forecasting for {len(all_metrics_to_forecast)} metrics...")
+    # Publish the frame once for all workers: a memory-mapped Arrow file in tmpfs that each
+    # worker reads only the columns (and segment rows) it needs from. Every published file
+    # is removed when the block exits.
+    with ExitStack() as published:
+        frame = published.enter_context(published_frame(featured_df))
+        update_progress(task_id, "forecasting", 25, f"Running parallel forecasting for {len(all_metrics_to_forecast)} metrics...")
+    
+        # Core metrics are started first, then efficiency/ratio metrics, then segments (when they
+        # are fitted per segment on the pool); whatever is unfinished at the deadline is deferred
+        jobs = [
+            ForecastJob(metric, forecast_metric, (metric, frame),
+                        PRIORITY_CORE if metric in core_metrics else PRIORITY_SECONDARY)
+            for metric in all_metrics_to_forecast if metric not in derived_metrics
+        ]
+        if segment_forecast_engine == "prophet":
+            for segment_col in segment_columns:
+                for segment, df_segment in screened_segments[segment_col][0].items():
+                    # Each segment is published on its own so its worker reads no other rows
+                    segment_frame = published.enter_context(published_frame(df_segment[['date', 'revenue']]))
+                    jobs.append(ForecastJob((segment_col, segment), forecast_segment, (segment, segment_frame), PRIORITY_SEGMENT))
     
-    # Run parallel forecasting in a thread pool to avoid blocking the event loop
-    # This allows healthcheck and other endpoints to respond even during heavy processing
-    all_forecasts, all_model_health = await asyncio.to_thread(
-        _run_parallel_forecasting, 
-        df_json, 
-        all_metrics_to_forecast
-    )
+        # Run the scheduler in a thread to avoid blocking the event loop
+        # This allows healthcheck and other endpoints to respond even during heavy processing
+        schedule = await asyncio.to_thread(scheduler.run, jobs)
+    
+    all_forecasts = {}
+    all_model_health = {}
+    for metric in all_metrics_to_forecast:
+        if metric in schedule.results:
+            metric_name, forecast, model_health = schedule.results[metric]
+            if forecast:  # Only add successful forecasts
+                all_forecasts[metric_name] = forecast
+                all_model_health[metric_name] = model_health
+        elif metric in schedule.deferred:
+            all_model_health[metric] = _deferred_health(metric, scheduler.budget_seconds)
+    if schedule.deferred:
+        secure_logger.warning(f"⏱️ Forecasting budget exhausted after {schedule.elapsed_seconds:.1f}s, deferred: {schedule.deferred}")
     
     update_progress(task_id, "forecasting", 50, "Core forecasting complete")
     
+    # HIERARCHICAL MODE: one reconciliation of total, regions and departments; the total revenue
+    # forecast serves as the hierarchy's top and is replaced by its coherent counterpart
+    hierarchy_forecasts, hierarchy_health = {}, {}
+    hierarchy_deferred = False
+    if hierarchical:
+        try:
+            hierarchy, hierarchy_deferred = await _run_within_budget(
+                scheduler, ForecastingModule(metric='revenue').generate_hierarchical_forecast,
+                featured_df, segment_columns, forecast_reconciliation, all_forecasts.get('revenue')
+            )
+            failure = None if hierarchy_deferred or hierarchy[0] else hierarchy[1].get('reason')
+        except Exception as e:
+            hierarchy, failure = None, str(e)
+        if failure is not None:
+            # Degrade to the per-segment batch forecasts rather than failing the report
+            secure_logger.warning(f"⚠️ Hierarchical reconciliation failed ({failure}), falling back to batch segment forecasts")
+            hierarchical = False
+            screened_segments = {
+                segment_col: _screen_segments(featured_df, segment_col, processing_results.get("segment_frames", {}))
+                for segment_col in segment_columns
+            }
+        elif hierarchy is not None:
+            hierarchy_forecasts, hierarchy_health = hierarchy
+        if hierarchy_forecasts and 'revenue' in all_forecasts:
+            # The report's revenue is the reconciled total: report its health, not the base fit's
+            all_forecasts['revenue'] = hierarchy_forecasts['total']
+            all_model_health['revenue'] = {
+                **hierarchy_health['total'], "base_model_selected": all_model_health['revenue'].get('best_model_selected')
+            }
+    
+    # Composite KPIs are derived from the final component forecasts (after reconciliation),
+    # so ratios stay consistent with the revenue the report returns
+    for metric in derived_metrics:
+        if any(component in schedule.deferred for component in COMPOSITE_METRICS[metric].components):
+            all_model_health[metric] = _deferred_health(metric, scheduler.budget_seconds)
+            continue
+        forecast, model_health = ForecastingModule(metric=metric).derive_forecast(all_forecasts, featured_df, all_model_health)
+        if forecast:
+            all_forecasts[metric] = forecast
+            all_model_health[metric] = model_health
+    
     # Calculate growth_rate forecast from revenue forecast
     if 'revenue' in all_forecasts and all_forecasts['revenue']:
         growth_rate_forecast = []
@@ -581,7 +636,7 @@ async def get_full_financial_report(
                 growth = ((forecast_point['predicted'] - prev_forecast) / prev_forecast * 100) if prev_forecast != 0 else 0
             else:
                 growth = 0
-            
+        
             growth_rate_forecast.append({
                 "date": forecast_point['date'],
                 "predicted": growth,
@@ -596,51 +651,48 @@ async def get_full_financial_report(
             "status": "Success"
         }
     
-    # PARALLEL REGIONAL FORECASTS (if region column exists with sufficient data)
-    if 'region' in featured_df.columns:
-        regions = featured_df['region'].unique().tolist()
-        
-        update_progress(task_id, "regional", 60, f"Forecasting {len(regions)} regions...")
-        
-        # Run parallel regional forecasting in a thread pool to avoid blocking the event loop
-        regional_forecasts = await asyncio.to_thread(
-            _run_parallel_regional_forecasting,
-            df_json,
-            regions
-        )
-        
-        if regional_forecasts:
-            all_forecasts['regional_revenue'] = regional_forecasts
-            all_model_health['regional_revenue'] = {
-                "model_id": f"model_regional_{int(datetime.now().timestamp())}",
-                "best_model_selected": "Prophet",
-                "forecast_metric": "regional_revenue",
-                "regions": list(regional_forecasts.keys()),
+    # REGIONAL / DEPARTMENTAL FORECASTS (if the column exists with sufficient data)
+    for segment_col, label, progress in (('region', 'regional', 60), ('department', 'departmental', 70)):
+        if segment_col not in segment_columns:
+            continue
+        metric_key = f"{label}_revenue"
+        eligible_segments, skipped_segments = screened_segments.get(segment_col, (featured_df[segment_col].unique().tolist(), {}))
+        update_progress(task_id, label, progress, f"Forecasting {len(eligible_segments)} {segment_col}s...")
+    
+        if hierarchical:
+            segment_forecasts = hierarchy_forecasts.get(segment_col, {})
+            deferred_segments = [str(s) for s in eligible_segments] if hierarchy_deferred else []
+        elif segment_forecast_engine == "prophet":
+            segment_forecasts, deferred_segments = _collect_segment_forecasts(schedule, segment_col)
+        else:
+            # Run batch segment forecasting in a thread (not blocking the event loop) within the budget
+            segment_forecasts, deferred = await _run_within_budget(
+                scheduler, _run_batch_segment_forecasting, featured_df, segment_col, list(eligible_segments)
+            )
+            segment_forecasts = segment_forecasts or {}
+            deferred_segments = [str(s) for s in eligible_segments] if deferred else []
+    
+        if segment_forecasts:
+            all_forecasts[metric_key] = segment_forecasts
+            all_model_health[metric_key] = {
+                "model_id": f"model_{label}_{int(datetime.now().timestamp())}",
+                "best_model_selected": "Reconciled" if hierarchical else "Prophet" if segment_forecast_engine == "prophet" else "Batch",
+                "forecast_metric": metric_key,
+                f"{segment_col}s": list(segment_forecasts.keys()),
                 "status": "Success"
             }
-    
-    # PARALLEL DEPARTMENTAL FORECASTS (if department column exists with sufficient data)
-    if 'department' in featured_df.columns:
-        departments = featured_df['department'].unique().tolist()
-        
-        update_progress(task_id, "departmental", 70, f"Forecasting {len(departments)} departments...")
-        
-        # Run parallel departmental forecasting in a thread pool to avoid blocking the event loop
-        dept_forecasts = await asyncio.to_thread(
-            _run_parallel_departmental_forecasting,
-            df_json,
-            departments
-        )
-        
-        if dept_forecasts:
-            all_forecasts['departmental_revenue'] = dept_forecasts
-            all_model_health['departmental_revenue'] = {
-                "model_id": f"model_departmental_{int(datetime.now().timestamp())}",
-                "best_model_selected": "Prophet",
-                "forecast_metric": "departmental_revenue",
-                "departments": list(dept_forecasts.keys()),
-                "status": "Success"
+            if hierarchical:
+                all_model_health[metric_key]["segments"] = hierarchy_health[segment_col]
+            if deferred_segments:
+                all_model_health[metric_key]["deferred"] = deferred_segments
+            if skipped_segments:
+                all_model_health[metric_key]["skipped"] = skipped_segments
+        elif deferred_segments:
+            all_model_health[metric_key] = {
+                **_deferred_health(metric_key, scheduler.budget_seconds), "deferred": deferred_segments
             }
+        elif skipped_segments:
+            all_model_health[metric_key] = {"forecast_metric": metric_key, "status": "Skipped", "skipped": skipped_segments}
     
     # Use multi-metric anomaly detection across all key KPIs (enhanced v2)
     update_progress(task_id, "analytics", 80, "Detecting anomalies across all metrics with ensemble AI...")
@@ -879,7 +931,7 @@ All forecast models operational. {len(all_model_health)} metrics forecasted with
 async def simulate_scenario_endpoint(
     file: UploadFile = File(
         ..., 
-        description="The financial data in CSV format to use as the baseline for the simulation."
+        description="The financial data in CSV, Parquet or Feather format to use as the baseline for the simulation."
     ),
     parameter: str = Form(
         ..., 
@@ -898,7 +950,9 @@ async def simulate_scenario_endpoint(
     - **Example**: See what happens to `profit` and `cashflow` if your `expenses` go up by `15%`.
     - **Returns**: A detailed report comparing the baseline metrics to the simulated results.
     """
-    processing_results = process_uploaded_file(file)
+    # The simulation only needs profit and the changed parameter - skip the rest of the KPI graph
+    kpi_targets = ['profit'] + ([parameter] if parameter in KPI_GRAPH else [])
+    processing_results = process_uploaded_file(file, kpi_targets=kpi_targets)
     featured_df = processing_results["featured_df"]
     simulation_module = ScenarioSimulationEngine()
     simulation_report = simulation_module.simulate_scenario(df=featured_df, parameter=parameter, change_pct=change_pct)
@@ -0,0 +1,170 @@
+"""
+Fast Baseline Forecasters
+
+Cheap statistical models for monthly series that fit in milliseconds. The
+forecasting module backtests these first and only escalates to Prophet when
+none of them reaches the accuracy threshold.
+
+Every forecaster takes a 1-D array of monthly values and a horizon and returns
+(in-sample fitted values, forecast). Fitted values may contain NaN where the
+model has no prediction (e.g. the first season of a seasonal naive model).
+
+Models:
+- SeasonalNaive:  the value from the same month last year (last value when
+                  there is less than one full season)
+- HoltWinters:    additive damped-trend exponential smoothing, with additive
+                  yearly seasonality from two full seasons on (statsmodels)
+- Theta:          the Theta method, deseasonalized from two full seasons on
+                  (statsmodels)
+- LinearSeasonal: closed-form least squares on a linear trend plus month
+                  dummies (trend only below two full seasons)
+
+LinearSeasonal and HoltSeasonal (damped Holt on the seasonally adjusted
+series, smoothing weights picked per series from a fixed grid) also accept a
+2-D array of equally long series (series x time) and fit them all at once with
+numpy broadcasting; BATCH_MODELS lists them for batch forecasting.
+"""
+
+import warnings
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.forecasting.theta import ThetaModel
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+SEASONAL_PERIOD = 12
+# Smoothing-weight grid searched by holt_seasonal (every series picks its own pair)
+HOLT_ALPHAS = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+HOLT_BETAS = np.array([0.01, 0.1, 0.3])
+HOLT_DAMPING = 0.98
+# Two-sided 95% interval, matching Prophet's interval_width
+INTERVAL_Z = 1.96
+
+
+def seasonal_naive(y: np.ndarray, horizon: int, period: int = SEASONAL_PERIOD) -> Tuple[np.ndarray, np.ndarray]:
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) < period:
+        fitted = np.concatenate([[np.nan], y[:-1]])
+        return fitted, np.full(horizon, y[-1])
+    fitted = np.concatenate([np.full(period, np.nan), y[:-period]])
+    last_season = y[-period:]
+    return fitted, last_season[np.arange(horizon) % period]
+
+
+def holt_winters(y: np.ndarray, horizon: int, period: int = SEASONAL_PERIOD) -> Tuple[np.ndarray, np.ndarray]:
+    y = np.asarray(y, dtype=np.float64)
+    seasonal = 'add' if len(y) >= 2 * period else None
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = ExponentialSmoothing(
+            y, trend='add', damped_trend=True, seasonal=seasonal,
+            seasonal_periods=period if seasonal else None, initialization_method='estimated'
+        ).fit()
+    return np.asarray(model.fittedvalues), np.asarray(model.forecast(horizon))
+
+
+def theta(y: np.ndarray, horizon: int, period: int = SEASONAL_PERIOD) -> Tuple[np.ndarray, np.ndarray]:
+    y = np.asarray(y, dtype=np.float64)
+    # ThetaModel needs a dated index to carry the forecast forward
+    series = pd.Series(y, index=pd.period_range('2000-01', periods=len(y), freq='M'))
+    deseasonalize = len(y) >= 2 * period
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = ThetaModel(series, period=period, deseasonalize=deseasonalize,
+                           method='additive' if deseasonalize else 'auto').fit()
+        forecast = np.asarray(model.forecast(horizon))
+    # ThetaModel exposes no in-sample fit; the naive one-step error stands in for its residual spread
+    fitted = np.concatenate([[np.nan], y[:-1]])
+    return fitted, forecast
+
+
+def _trend_season_fit(y: np.ndarray, horizon: int, period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Least-squares trend and seasonal components over history + horizon for 1-D or 2-D `y`."""
+    n = y.shape[-1]
+    t = np.arange(n + horizon, dtype=np.float64)
+    columns = [np.ones_like(t), t / max(n - 1, 1)]
+    if n >= 2 * period:
+        season = t.astype(int) % period
+        columns.extend((season == month).astype(np.float64) for month in range(1, period))
+    design = np.column_stack(columns)
+    coefficients, *_ = np.linalg.lstsq(design[:n], y.T, rcond=None)
+    trend = (design[:, :2] @ coefficients[:2]).T
+    seasonal = (design[:, 2:] @ coefficients[2:]).T
+    return trend, seasonal
+
+
+def linear_seasonal(y: np.ndarray, horizon: int, period: int = SEASONAL_PERIOD) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Least-squares trend + month dummies. `y` may be 2-D (series x time): all series are
+    solved in one lstsq call against the shared design matrix.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.shape[-1]
+    trend, seasonal = _trend_season_fit(y, horizon, period)
+    values = trend + seasonal
+    return values[..., :n], values[..., n:]
+
+
+def holt_seasonal(y: np.ndarray, horizon: int, period: int = SEASONAL_PERIOD) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Damped Holt linear smoothing on the seasonally adjusted series (month effects from the
+    least-squares fit), vectorized over series and over the (alpha, beta) grid; each series
+    keeps the pair with the smallest one-step squared error. `y` may be 1-D or 2-D.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    squeeze = y.ndim == 1
+    y = np.atleast_2d(y)
+    n = y.shape[-1]
+    _, seasonal = _trend_season_fit(y, horizon, period)
+    adjusted = y - seasonal[:, :n]
+
+    alpha, beta = (grid.ravel() for grid in np.meshgrid(HOLT_ALPHAS, HOLT_BETAS, indexing='ij'))
+    level = np.repeat(adjusted[:, :1], len(alpha), axis=1)
+    trend = np.repeat(adjusted[:, 1:2] - adjusted[:, :1], len(alpha), axis=1)
+    fitted = np.full((y.shape[0], len(alpha), n), np.nan)
+    sse = np.zeros((y.shape[0], len(alpha)))
+    for t in range(1, n):
+        prediction = level + HOLT_DAMPING * trend
+        fitted[:, :, t] = prediction
+        error = adjusted[:, t:t + 1] - prediction
+        sse += error ** 2
+        level = prediction + alpha * error
+        trend = HOLT_DAMPING * trend + alpha * beta * error
+
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(y.shape[0])
+    steps = np.cumsum(HOLT_DAMPING ** np.arange(1, horizon + 1))
+    forecast = level[rows, best][:, None] + np.multiply.outer(trend[rows, best], steps) + seasonal[:, n:]
+    fitted = fitted[rows, best] + seasonal[:, :n]
+    return (fitted[0], forecast[0]) if squeeze else (fitted, forecast)
+
+
+BASELINE_MODELS: Dict[str, Callable[..., Tuple[np.ndarray, np.ndarray]]] = {
+    "SeasonalNaive": seasonal_naive,
+    "HoltWinters": holt_winters,
+    "Theta": theta,
+    "LinearSeasonal": linear_seasonal,
+}
+
+
+# Models that fit a 2-D (series x time) array in one vectorized pass
+BATCH_MODELS: Dict[str, Callable[..., Tuple[np.ndarray, np.ndarray]]] = {
+    "LinearSeasonal": linear_seasonal,
+    "HoltSeasonal": holt_seasonal,
+}
+
+
+def prediction_interval(y: np.ndarray, fitted: np.ndarray, forecast: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    95% interval from the in-sample residual spread, widening with sqrt(h) over the
+    horizon. `y` and `fitted` may be 2-D (series x time).
+    """
+    residuals = np.asarray(y, dtype=np.float64) - np.asarray(fitted, dtype=np.float64)
+    valid = np.isfinite(residuals)
+    counts = valid.sum(axis=-1)
+    squares = np.where(valid, residuals, 0.0) ** 2
+    sigma = np.sqrt(squares.sum(axis=-1) / np.maximum(counts - 1, 1))
+    steps = np.sqrt(np.arange(1, forecast.shape[-1] + 1))
+    width = INTERVAL_Z * np.multiply.outer(sigma, steps)
+    return forecast - width, forecast + width
@@ -0,0 +1,232 @@
+"""
+Bounded LRU Caches with Optional Persistence
+
+In-process LRU caches for expensive, deterministic pipeline results (e.g. header
+mappings keyed by schema fingerprint, forecasts keyed by series fingerprint). Each cache can be backed by a persistent
+tier so results survive restarts and are shared across worker processes:
+
+- memory: in-process only (default)
+- disk:   one JSON file per entry under a cache directory
+- redis:  JSON values in Redis under a namespaced key
+
+Values must be JSON-serializable. Caches are bounded by entry count and,
+optionally, by the total serialized size of their entries (max_bytes).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from aiml_engine.utils.helpers import CustomJSONEncoder
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable SHA-256 fingerprint of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, cls=CustomJSONEncoder)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def entry_size(value: Any) -> int:
+    """Serialized size of a cache value in bytes (what the persistent tiers store)."""
+    return len(json.dumps(value, cls=CustomJSONEncoder).encode('utf-8'))
+
+
+class DiskCacheBackend:
+    """
+    Persists cache entries as JSON files under `directory/namespace/`. With max_bytes,
+    the least recently written files are removed once the directory grows past it.
+    """
+
+    def __init__(self, directory: str, namespace: str, max_bytes: int = None):
+        self.directory = os.path.join(directory, namespace)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, value: Any):
+        # Write-then-rename so concurrent readers never see a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f, cls=CustomJSONEncoder)
+        os.replace(tmp_path, self._path(key))
+        if self.max_bytes:
+            self._prune()
+
+    def _prune(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.delete(name[:-len('.json')])
+            total -= size
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                self.delete(name[:-len('.json')])
+
+
+class RedisCacheBackend:
+    """Persists cache entries as JSON strings in Redis under `praxifi:cache:namespace:key`."""
+
+    def __init__(self, namespace: str, host: str = None, port: int = None, ttl_seconds: int = 30 * 86400):
+        import redis
+        self._redis_client = redis.Redis(
+            host=host or os.getenv("REDIS_HOST", "localhost"),
+            port=int(port or os.getenv("REDIS_PORT", 6379)),
+            db=0, decode_responses=True
+        )
+        self.prefix = f"praxifi:cache:{namespace}:"
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._redis_client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any):
+        self._redis_client.set(self.prefix + key, json.dumps(value, cls=CustomJSONEncoder), ex=self.ttl_seconds)
+
+    def delete(self, key: str):
+        self._redis_client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self._redis_client.scan_iter(match=self.prefix + "*"):
+            self._redis_client.delete(key)
+
+
+def create_cache_backend(kind: str, namespace: str, directory: str = None, max_bytes: int = None):
+    """
+    Builds a persistent tier from a backend name ('memory', 'disk' or 'redis').
+    Returns None for 'memory'. `max_bytes` bounds the disk tier; Redis entries expire by TTL.
+    """
+    kind = (kind or "memory").lower()
+    if kind == "disk":
+        return DiskCacheBackend(directory or os.getenv("CACHE_DIR", "/tmp/praxifi_cache"), namespace, max_bytes)
+    if kind == "redis":
+        return RedisCacheBackend(namespace)
+    return None
+
+
+class PersistentLRUCache:
+    """
+    Thread-safe, bounded LRU cache with an optional persistent tier.
+
+    Lookups check memory first, then the backend; backend hits are promoted
+    into memory. Hit/miss counters cover both tiers. With max_bytes, least recently
+    used entries are also evicted once the serialized size of all entries exceeds it.
+    """
+
+    def __init__(self, max_entries: int = 256, backend=None, namespace: str = "cache", max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = None
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except Exception:
+                value = None  # A flaky persistent tier must never break the pipeline
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._store(key, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value)
+            except Exception:
+                pass
+
+    def _store(self, key: str, value: Any):
+        size = entry_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return  # Larger than the whole cache: keep it in the persistent tier only
+        self._discard(key)
+        self._entries[key] = value
+        self._sizes[key] = size
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or (self.max_bytes and self.total_bytes > self.max_bytes):
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: str):
+        if key in self._entries:
+            del self._entries[key]
+            self.total_bytes -= self._sizes.pop(key)
+
+    def invalidate(self, key: str = None):
+        """Drops one entry, or every entry (memory and persistent tier) when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._sizes.clear()
+                self.total_bytes = 0
+            else:
+                self._discard(key)
+        if self.backend is not None:
+            try:
+                self.backend.clear() if key is None else self.backend.delete(key)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "backend": type(self.backend).__name__ if self.backend is not None else "memory"
+            }
@@ -1,7 +1,170 @@
 import pandas as pd
-from typing import Tuple, Dict
-import spacy
+import numpy as np
+from typing import Tuple, Dict, List, Union, IO
+import difflib
+import io
+import os
 import re
+import json
+import threading
+import warnings
+
+from aiml_engine.core.cache import PersistentLRUCache, create_cache_backend, fingerprint
+from aiml_engine.core.numeric_parsing import clean_numeric_column
+from aiml_engine.core.date_parsing import format_matches, infer_date_format, parse_dates
+
+# pyarrow is optional: it powers the multithreaded CSV reader and Parquet/Feather input
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as pa_feather
+    import pyarrow.parquet as pa_parquet
+except ImportError:
+    pa = None
+
+# Process-wide NLP registry: the spaCy model and the synonym embedding matrices
+# are loaded once per process and shared by every DataIngestion instance.
+_global_nlp = None
+_global_synonym_indexes = {}
+_nlp_registry_lock = threading.Lock()
+
+
+def get_nlp_model(model_name: str = "en_core_web_sm"):
+    """Get or create the process-wide spaCy model used for header mapping."""
+    global _global_nlp
+    if _global_nlp is None:
+        with _nlp_registry_lock:
+            if _global_nlp is None:
+                # Imported lazily so deployments running the lexical matcher only
+                # never pay for spaCy
+                import spacy
+                try:
+                    _global_nlp = spacy.load(model_name)
+                except OSError:
+                    print(f"Downloading spaCy model '{model_name}'...")
+                    from spacy.cli import download
+                    try:
+                        download(model_name)
+                    except SystemExit as e:
+                        # spaCy's CLI exits the process when the download fails (e.g. no network)
+                        raise OSError(f"spaCy model '{model_name}' is not installed and could not be downloaded") from e
+                    _global_nlp = spacy.load(model_name)
+    return _global_nlp
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scales every row to unit length. All-zero rows stay zero (similarity 0)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+class SynonymEmbeddingIndex:
+    """
+    Unit-normalized embedding matrix for every synonym of a unified schema.
+    Scoring a batch of headers against all synonyms is a single matrix product,
+    with the same semantics as spaCy's Doc.similarity (cosine of document vectors,
+    1.0 for token-identical texts).
+    """
+    def __init__(self, nlp, unified_schema: Dict[str, List[str]]):
+        self.keys = []
+        synonyms = []
+        for unified_key, key_synonyms in unified_schema.items():
+            for synonym in key_synonyms:
+                self.keys.append(unified_key)
+                synonyms.append(synonym)
+
+        docs = list(nlp.pipe(synonyms))
+        self.matrix = _normalize_rows(np.vstack([doc.vector for doc in docs]).astype(np.float32))
+
+        # Token-identical texts are a perfect match regardless of their vectors
+        self._exact_matches = {}
+        for position, doc in enumerate(docs):
+            self._exact_matches.setdefault(tuple(token.orth for token in doc), []).append(position)
+
+    def similarities(self, docs: List) -> np.ndarray:
+        """Returns a (len(docs), n_synonyms) cosine-similarity matrix."""
+        vectors = _normalize_rows(np.vstack([doc.vector for doc in docs]).astype(np.float32))
+        similarity = vectors @ self.matrix.T
+        for row, doc in enumerate(docs):
+            for position in self._exact_matches.get(tuple(token.orth for token in doc), []):
+                similarity[row, position] = 1.0
+        return similarity
+
+
+def get_synonym_index(nlp, unified_schema: Dict[str, List[str]]) -> SynonymEmbeddingIndex:
+    """Get or build the shared synonym index for a (model, schema) pair."""
+    cache_key = (id(nlp), json.dumps(unified_schema, sort_keys=True))
+    index = _global_synonym_indexes.get(cache_key)
+    if index is None:
+        with _nlp_registry_lock:
+            index = _global_synonym_indexes.get(cache_key)
+            if index is None:
+                index = SynonymEmbeddingIndex(nlp, unified_schema)
+                _global_synonym_indexes[cache_key] = index
+    return index
+
+
+# Header mappings keyed by schema fingerprint (see DataIngestion.schema_fingerprint)
+_global_header_cache = None
+
+
+def get_header_mapping_cache() -> PersistentLRUCache:
+    """
+    Get or create the process-wide header-mapping cache.
+
+    Configured via HEADER_MAPPING_CACHE_SIZE (entries) and HEADER_MAPPING_CACHE_BACKEND
+    ('memory', 'disk' or 'redis'; disk entries go under CACHE_DIR).
+    """
+    global _global_header_cache
+    if _global_header_cache is None:
+        with _nlp_registry_lock:
+            if _global_header_cache is None:
+                _global_header_cache = PersistentLRUCache(
+                    max_entries=int(os.getenv("HEADER_MAPPING_CACHE_SIZE", "512")),
+                    backend=create_cache_backend(os.getenv("HEADER_MAPPING_CACHE_BACKEND", "memory"), "header_mappings"),
+                    namespace="header_mappings"
+                )
+    return _global_header_cache
+
+
+def warm_up_header_matcher():
+    """
+    Loads the shared spaCy model and default synonym matrix (called at API startup).
+    A model that cannot be loaded does not stop the API: uploads use the lexical tiers.
+    """
+    ingestion = DataIngestion()
+    if not ingestion.use_nlp:
+        return
+    try:
+        get_synonym_index(ingestion.nlp, ingestion.unified_schema)
+    except Exception as e:
+        print(f"Header matcher NLP tier unavailable at startup ({e}); serving lexical matches only.")
+
+
+class ByteBufferReader(io.RawIOBase):
+    """
+    Read-only file object over an in-memory buffer (bytes, bytearray or memoryview).
+    Reads copy straight from the caller's buffer into the parser's chunk, so an
+    upload is never duplicated as a decoded str or spilled to a temp file.
+    """
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview]):
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        size = min(len(target), len(self._view) - self._position)
+        target[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def close(self):
+        self._view.release()
+        super().close()
+
 
 class DataIngestion:
     """
@@ -9,14 +172,28 @@ class DataIngestion:
     This final, perfected version includes a blocklist to prevent incorrect NLP mappings
     and ensures human-readable date formats in previews.
     """
-    def __init__(self):
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            print("Downloading spaCy model 'en_core_web_sm'...")
-            from spacy.cli import download
-            download("en_core_web_sm")
-            self.nlp = spacy.load("en_core_web_sm")
+    SUPPORTED_FORMATS = ("csv", "parquet", "feather")
+
+    def __init__(self, nlp=None, use_nlp: bool = None, engine: str = None):
+        # The spaCy model is shared process-wide and only loaded when a header
+        # survives the lexical tiers. HEADER_MATCHER_NLP_ENABLED=false disables it entirely.
+        self._nlp = nlp
+        if use_nlp is None:
+            use_nlp = os.getenv("HEADER_MATCHER_NLP_ENABLED", "true").lower() == "true"
+        self.use_nlp = use_nlp
+        self.fuzzy_match_threshold = float(os.getenv("HEADER_MATCHER_FUZZY_THRESHOLD", "0.85"))
+        self.last_match_tiers = {}
+        self.nlp_tier_failed = False
+        self.numeric_parse_failures = {}
+        self.date_format = None
+        self._layout_key = None
+        self._layout_entry = None
+
+        # CSV reader: 'pandas' (default) or 'pyarrow' (multithreaded). INGESTION_ENGINE sets the default.
+        self.engine = (engine or os.getenv("INGESTION_ENGINE", "pandas")).lower()
+        if self.engine == "pyarrow" and pa is None:
+            print("pyarrow is not installed; falling back to the pandas CSV reader.")
+            self.engine = "pandas"
             
         self.unified_schema = {
             "date": ["date", "timestamp", "period", "transaction date", "date of sale"],
@@ -39,70 +216,284 @@ class DataIngestion:
         self.blocklist = ["note", "notes", "comment", "comments", "description", "memo"]
         # --- END OF FIX ---
 
-    def _get_best_match(self, column_name: str) -> Tuple[str, float]:
-        cleaned_name = column_name.lower().strip().replace("_", " ").replace('"', '')
-        if not cleaned_name: return None, 0.0
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = get_nlp_model()
+        return self._nlp
 
-        # --- FIX #2: Check against the blocklist first ---
-        if any(blocked_word in cleaned_name for blocked_word in self.blocklist):
-            return None, 0.0 # Immediately reject if it contains a blocked word
-        # --- END OF FIX ---
+    @staticmethod
+    def _clean_header(column_name: str) -> str:
+        return column_name.lower().strip().replace("_", " ").replace('"', '')
 
-        col_doc = self.nlp(cleaned_name)
-        
-        max_similarity = 0.0
-        best_match = None
-        
+    @staticmethod
+    def _normalize_header(name: str) -> str:
+        """Lowercases and collapses punctuation/whitespace, e.g. 'Net_Income ' -> 'net income'."""
+        return " ".join(re.sub(r'[^a-z0-9]+', ' ', name.lower()).split())
+
+    def _lexical_match(self, cleaned_name: str, synonym_lookup: Dict[str, str]) -> Tuple[str, float, str]:
+        """
+        Cheap tiers of the header matcher: an exact or normalized synonym hit, then
+        edit-distance similarity. Returns (unified_key, score, tier) or (None, 0.0, None).
+        """
+        normalized_name = self._normalize_header(cleaned_name)
+        if normalized_name in synonym_lookup:
+            return synonym_lookup[normalized_name], 1.0, "exact"
+
+        # Very short headers ('ar', 'ap') are too ambiguous for fuzzy matching
+        if len(normalized_name) < 4:
+            return None, 0.0, None
+
+        best_match, best_score = None, 0.0
+        for synonym, unified_key in synonym_lookup.items():
+            score = difflib.SequenceMatcher(None, normalized_name, synonym).ratio()
+            if score > best_score:
+                best_match, best_score = unified_key, score
+        if best_score >= self.fuzzy_match_threshold:
+            return best_match, best_score, "fuzzy"
+        return None, 0.0, None
+
+    def _match_headers(self, column_names: List[str]) -> List[Tuple[str, float]]:
+        """
+        Maps a batch of headers to unified keys with a tiered matcher. Exact, normalized
+        and edit-distance matches are resolved lexically; only the leftovers are embedded
+        in one nlp.pipe() call and scored against the precomputed synonym matrix.
+        """
+        results = [(None, 0.0)] * len(column_names)
+        self.last_match_tiers = {}
+        self.nlp_tier_failed = False
+
+        synonym_lookup = {}
+        for unified_key, synonyms in self.unified_schema.items():
+            for synonym in synonyms:
+                synonym_lookup.setdefault(self._normalize_header(synonym), unified_key)
+
+        candidates = []
+        for position, column_name in enumerate(column_names):
+            cleaned_name = self._clean_header(column_name)
+            if not cleaned_name:
+                continue
+            # --- FIX #2: Check against the blocklist first ---
+            if any(blocked_word in cleaned_name for blocked_word in self.blocklist):
+                continue # Immediately reject if it contains a blocked word
+            # --- END OF FIX ---
+            best_match, score, tier = self._lexical_match(cleaned_name, synonym_lookup)
+            if best_match:
+                results[position] = (best_match, score)
+                self.last_match_tiers[column_name] = tier
+            else:
+                candidates.append((position, cleaned_name))
+
+        if not candidates or not self.use_nlp:
+            return results
+
+        try:
+            synonym_index = get_synonym_index(self.nlp, self.unified_schema)
+        except Exception as e:
+            # No spaCy model (missing, not downloadable): keep the lexical matches and
+            # do not cache this layout, so it is matched fully once the model is back
+            print(f"Header matcher NLP tier unavailable ({e}); using lexical matches only.")
+            self.nlp_tier_failed = True
+            return results
         # Suppress spaCy similarity warning for small models
-        import warnings
         with warnings.catch_warnings():
             warnings.filterwarnings("ignore", category=UserWarning)
-            for unified_key, synonyms in self.unified_schema.items():
-                for synonym in synonyms:
-                    synonym_doc = self.nlp(synonym)
-                    similarity = col_doc.similarity(synonym_doc)
-                    if similarity > max_similarity:
-                        max_similarity = similarity
-                        best_match = unified_key
-        
-        if max_similarity > 0.75:
-            return best_match, max_similarity
-        return None, 0.0
+            docs = list(self.nlp.pipe([cleaned_name for _, cleaned_name in candidates]))
+        similarity = synonym_index.similarities(docs)
+
+        # argmax keeps the first synonym on ties, like the original sequential scan
+        best_positions = similarity.argmax(axis=1)
+        for row, (position, _) in enumerate(candidates):
+            max_similarity = float(similarity[row, best_positions[row]])
+            if max_similarity > 0.75:
+                results[position] = (synonym_index.keys[best_positions[row]], max_similarity)
+                self.last_match_tiers[column_names[position]] = "nlp"
+        return results
+
+    def _get_best_match(self, column_name: str) -> Tuple[str, float]:
+        return self._match_headers([column_name])[0]
+
+    def schema_version(self) -> str:
+        """
+        Fingerprint of everything that influences header matching. It is part of every
+        cache key, so editing unified_schema or blocklist invalidates cached mappings.
+        """
+        return fingerprint(self.unified_schema, self.blocklist, self.fuzzy_match_threshold, self.use_nlp)
+
+    def schema_fingerprint(self, headers: List[str]) -> str:
+        """Cache key for an ordered, cleaned header list under the current schema version."""
+        return fingerprint(self.schema_version(), headers)
+
+    def invalidate_header_cache(self):
+        """Drops every cached header mapping (memory and persistent tier)."""
+        get_header_mapping_cache().invalidate()
 
-    def ingest_and_normalize(self, file_path: str) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    def _map_headers(self, original_headers: List[str]) -> Dict[str, str]:
+        """
+        Resolves {original header: unified key} for a header layout. Layouts seen before
+        (same ordered headers, same schema version) cost one cache lookup.
+        """
+        header_cache = get_header_mapping_cache()
+        cache_key = self.schema_fingerprint(original_headers)
+        cached = header_cache.get(cache_key)
+        self._layout_key = cache_key
+        if cached is not None:
+            self._layout_entry = cached
+            self.last_match_tiers = {col: "cache" for col in cached["header_mappings"]}
+            return dict(cached["header_mappings"])
+
+        header_mappings = {}
+        for original_col, (best_match, _) in zip(original_headers, self._match_headers(original_headers)):
+            if best_match and best_match not in header_mappings.values():
+                header_mappings[original_col] = best_match
+
+        self._layout_entry = {"header_mappings": header_mappings}
+        if self.nlp_tier_failed:
+            self._layout_key = None  # Nor the date format found for it
+        else:
+            header_cache.set(cache_key, self._layout_entry)
+        return header_mappings
+
+    def _resolve_date_format(self, dates: pd.Series):
+        """
+        Date format for the current header layout. The format cached alongside the
+        header mapping is reused after a quick check against a sample of this file;
+        otherwise it is inferred once and written back to the layout's cache entry.
+        """
+        entry = self._layout_entry if self._layout_entry is not None else {}
+        cached_format = entry.get("date_format")
+        if cached_format and format_matches(dates, cached_format):
+            return cached_format
+
+        date_format = infer_date_format(dates)
+        if date_format and self._layout_key is not None:
+            self._layout_entry = {**entry, "date_format": date_format}
+            get_header_mapping_cache().set(self._layout_key, self._layout_entry)
+        return date_format
+
+    @staticmethod
+    def detect_format(source, filename: str = None) -> str:
+        """Detects 'csv', 'parquet' or 'feather' from the file name, falling back to magic bytes."""
+        name = filename or (source if isinstance(source, str) else None)
+        if name:
+            extension = os.path.splitext(name)[1].lower()
+            if extension in (".parquet", ".pq"):
+                return "parquet"
+            if extension in (".feather", ".arrow", ".ipc"):
+                return "feather"
+            if extension:
+                return "csv"
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            header = bytes(memoryview(source)[:6])
+            if header[:4] == b"PAR1":
+                return "parquet"
+            if header == b"ARROW1" or header[:4] == b"FEA1":
+                return "feather"
+        return "csv"
+
+    @staticmethod
+    def _arrow_source(source, copy_mutable: bool = False):
+        """
+        Wraps buffers without copying so Arrow reads them in place. Readers whose output can
+        point into the input (Feather/IPC maps uncompressed columns zero-copy) pass
+        `copy_mutable` so a bytearray/memoryview the caller may overwrite is copied first.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            if copy_mutable and not isinstance(source, bytes):
+                source = bytes(source)
+            return pa.BufferReader(pa.py_buffer(source))
+        return source
+
+    def _read_csv_with_arrow(self, source) -> pd.DataFrame:
+        """
+        Multithreaded CSV parse with Arrow. Leading whitespace in string cells is
+        trimmed to match skipinitialspace=True; strings stay Arrow-backed and
+        null-free numeric columns convert to NumPy without a copy.
+        """
+        table = pa_csv.read_csv(
+            self._arrow_source(source),
+            read_options=pa_csv.ReadOptions(use_threads=True),
+            parse_options=pa_csv.ParseOptions(delimiter=',', quote_char='"'),
+            convert_options=pa_csv.ConvertOptions(strings_can_be_null=True),
+        )
+        for position, field in enumerate(table.schema):
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                table = table.set_column(position, field.name, pc.utf8_ltrim_whitespace(table.column(position)))
+        return self._arrow_to_pandas(table)
+
+    @staticmethod
+    def _arrow_to_pandas(table) -> pd.DataFrame:
+        return table.to_pandas(
+            split_blocks=True, self_destruct=True,
+            types_mapper={pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}.get
+        )
+
+    def _read_source(self, source, file_format: str) -> pd.DataFrame:
+        if file_format in ("parquet", "feather"):
+            if pa is None:
+                raise ValueError(f"pyarrow is required to read {file_format} files")
+            if file_format == "parquet":
+                table = pa_parquet.read_table(self._arrow_source(source), use_threads=True)
+            else:
+                table = pa_feather.read_table(self._arrow_source(source, copy_mutable=True), use_threads=True)
+            return self._arrow_to_pandas(table)
+
+        if self.engine == "pyarrow":
+            try:
+                return self._read_csv_with_arrow(source)
+            except pa.ArrowInvalid as e:
+                # Arrow infers types per block and rejects columns whose type changes
+                # mid-file; the pandas reader copes with those
+                print(f"Arrow CSV reader failed ({e}); retrying with pandas.")
+                if hasattr(source, "seek"):
+                    source.seek(0)
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BufferedReader(ByteBufferReader(source))
+        return pd.read_csv(source, header=0, sep=',', quotechar='"', skipinitialspace=True)
+
+    def ingest_and_normalize(self, source: Union[str, bytes, bytearray, memoryview, IO],
+                             file_format: str = None, filename: str = None) -> Tuple[pd.DataFrame, Dict[str, str]]:
+        """
+        Reads and normalizes a CSV, Parquet or Feather file. `source` may be a file path,
+        an in-memory buffer (bytes/bytearray/memoryview) or any readable file object.
+        The format is taken from `file_format`, else detected from `filename`/the path/magic bytes.
+        The returned frame never shares memory with `source`: every reader either decodes into
+        fresh buffers or copies a mutable buffer first, so the caller may wipe the upload.
+        """
+        file_format = (file_format or self.detect_format(source, filename)).lower()
+        if file_format not in self.SUPPORTED_FORMATS:
+            print(f"Unsupported file format: {file_format}")
+            return pd.DataFrame(), {}
         try:
-            df = pd.read_csv(file_path, header=0, sep=',', quotechar='"', skipinitialspace=True)
+            df = self._read_source(source, file_format)
         except Exception as e:
-            print(f"Error reading CSV file: {e}")
+            print(f"Error reading {file_format.upper()} file: {e}")
             return pd.DataFrame(), {}
 
         df.columns = df.columns.str.strip().str.replace('"', '')
         original_headers = df.columns.tolist()
         
-        header_mappings = {}
-        new_columns = {}
-        unmapped_columns = []
-        for original_col in original_headers:
-            best_match, _ = self._get_best_match(original_col)
-            if best_match and best_match not in new_columns.values():
-                header_mappings[original_col] = best_match
-                new_columns[original_col] = best_match
-            else:
-                unmapped_columns.append(original_col)
+        header_mappings = self._map_headers(original_headers)
+        new_columns = dict(header_mappings)
+        unmapped_columns = [col for col in original_headers if col not in header_mappings]
         
         df.rename(columns=new_columns, inplace=True)
         
+        # Single vectorized pass per text column; already-numeric columns are skipped
+        self.numeric_parse_failures = {}
         for numeric_col in self.numeric_keys:
             if numeric_col in df.columns:
-                df[numeric_col] = df[numeric_col].astype(str)
-                df[numeric_col] = df[numeric_col].str.replace(r'[^\d.-]', '', regex=True)
-                df[numeric_col] = pd.to_numeric(df[numeric_col], errors='coerce')
+                df[numeric_col], self.numeric_parse_failures[numeric_col] = clean_numeric_column(df[numeric_col])
         
+        self.date_format = None
         if "date" in df.columns:
             try:
-                # --- FIX #1: THE DATE FORMAT FIX IS APPLIED HERE ---
-                # We handle date conversion with more care now
-                df['date'] = pd.to_datetime(df['date'], errors='coerce')
+                # One explicit-format pass instead of per-element parsing; the datetime64
+                # column flows downstream so later stages skip reconversion
+                if not pd.api.types.is_datetime64_any_dtype(df['date']):
+                    self.date_format = self._resolve_date_format(df['date'])
+                df['date'] = parse_dates(df['date'], self.date_format)
             except Exception as e:
                 print(f"Could not parse the date column effectively: {e}")
                 # Don't drop the column, just let validation handle the NaTs
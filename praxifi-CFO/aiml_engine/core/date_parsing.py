@@ -0,0 +1,80 @@
+"""
+Date-Format Inference
+
+Parsing a date column without a format makes pandas fall back to per-element
+dateutil parsing whenever the first value does not describe the rest. Instead,
+the format is inferred once from a small sample and the whole column is parsed
+with that explicit format in a single vectorized pass.
+
+Inference order:
+1. pandas' own guess from the first sampled value
+2. A list of common financial/export formats (month-first before day-first)
+3. 'ISO8601' for ISO strings with varying precision
+
+A format is only accepted when it parses every value in the sample, so
+"03/04/2024, 25/04/2024" correctly resolves to day-first.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+CANDIDATE_DATE_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y",
+    "%d.%m.%Y", "%Y%m%d", "%m/%d/%y", "%d/%m/%y",
+    "%Y-%m", "%Y/%m", "%m/%Y", "%b %Y", "%B %Y", "%b-%Y", "%b-%y", "%Y-%b",
+    "%d %b %Y", "%d-%b-%Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y",
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M",
+    "ISO8601",
+]
+
+
+def _sample_values(series: pd.Series, sample_size: int) -> pd.Series:
+    """Evenly spaced, de-duplicated non-empty strings drawn from the whole column."""
+    values = series.dropna()
+    if len(values) > sample_size:
+        values = values.iloc[np.linspace(0, len(values) - 1, sample_size).astype(int)]
+    values = values.astype(str).str.strip()
+    return values[values != ""].drop_duplicates()
+
+
+def _parses_all(sample: pd.Series, date_format: str) -> bool:
+    try:
+        pd.to_datetime(sample, format=date_format, errors="raise")
+        return True
+    except (ValueError, TypeError, OverflowError):
+        return False
+
+
+def infer_date_format(series: pd.Series, sample_size: int = 256) -> Optional[str]:
+    """Returns a strftime format (or 'ISO8601') that parses the sampled column, else None."""
+    sample = _sample_values(series, sample_size)
+    if sample.empty:
+        return None
+
+    guessed = guess_datetime_format(sample.iloc[0])
+    candidates = ([guessed] if guessed else []) + [fmt for fmt in CANDIDATE_DATE_FORMATS if fmt != guessed]
+    for date_format in candidates:
+        if _parses_all(sample, date_format):
+            return date_format
+    return None
+
+
+def format_matches(series: pd.Series, date_format: str, sample_size: int = 32) -> bool:
+    """True when `date_format` parses every value in a small sample of `series`."""
+    return _parses_all(_sample_values(series, sample_size), date_format)
+
+
+def parse_dates(series: pd.Series, date_format: Optional[str] = None) -> pd.Series:
+    """
+    Converts a column to datetime64 with an explicit format; unparseable values become NaT.
+    Columns that are already datetime64 are returned untouched.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if date_format is None:
+        return pd.to_datetime(series, errors="coerce")
+    return pd.to_datetime(series, format=date_format, errors="coerce")
@@ -1,207 +1,490 @@
+import os
+import time
 import pandas as pd
 import numpy as np
-from typing import Tuple, List, Dict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from aiml_engine.utils.helpers import safe_ratio, sort_by_date
+
+# Dimensionless / day-count KPIs that tolerate float32 (~7 significant digits).
+# Currency amounts stay float64 so sums over many rows keep their cents.
+RATIO_KPIS = [
+    'profit_margin', 'expense_ratio', 'marketing_spend_ratio', 'current_ratio',
+    'working_capital_ratio', 'quick_ratio', 'ar_turnover', 'dso', 'ap_turnover', 'dpo',
+    'cash_conversion_cycle', 'revenue_mom_growth', 'profit_mom_growth', 'expenses_mom_growth',
+    'revenue_yoy_growth', 'profit_yoy_growth', 'revenue_cagr', 'profit_cagr',
+    'debt_to_asset_ratio', 'debt_to_equity_ratio', 'solvency_ratio', 'roas', 'marketing_efficiency'
+]
+CALENDAR_DTYPES = {'year': np.int16, 'month': np.int8}
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+SEGMENT_COLUMNS = ['region', 'department']
+FLOAT32_RTOL = 1e-6
+
+@dataclass
+class KPIDefinition:
+    """
+    One node of the KPI dependency graph.
+
+    `inputs` are column names (source or derived); a tuple means "the first of these
+    that exists". `formula(df, *input_columns)` returns the new column (or a scalar), or
+    None when the data does not support the KPI. `kind` documents how far back a row's
+    value looks: 'row' (same row only), 'window' (earlier rows) or 'aggregate' (whole frame).
+    Window and aggregate formulas also accept `keys`, the segment columns (e.g. region)
+    whose series are computed independently.
+
+    For incremental updates, window KPIs name their `lookback` ('previous_row' or
+    'previous_year': the last earlier row of the same calendar month), and aggregate KPIs
+    provide `incremental(previous_df, new_df, *input_columns)` returning
+    (value, transformation) from the trailing rows only, or None.
+    """
+    name: str
+    inputs: List[Union[str, Tuple[str, ...]]]
+    formula: Callable[..., Any]
+    transformation: Union[str, Callable[..., str]] = ""
+    schema_sources: Optional[List[Union[str, Tuple[str, ...]]]] = None
+    kind: str = "row"
+    in_schema: bool = True
+    only_if_missing: bool = False
+    requires_datetime: bool = False
+    lookback: Optional[str] = None
+    incremental: Optional[Callable[..., Any]] = None
+
+    @staticmethod
+    def _resolve_column(df: pd.DataFrame, column) -> Optional[str]:
+        if isinstance(column, tuple):
+            return next((c for c in column if c in df.columns), None)
+        return column if column in df.columns else None
+
+    def resolve(self, df: pd.DataFrame) -> Optional[List[str]]:
+        """Input column names if the KPI can be computed on `df`, else None."""
+        if self.only_if_missing and self.name in df.columns:
+            return None
+        if self.requires_datetime and not ('date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['date'])):
+            return None
+        columns = [self._resolve_column(df, column) for column in self.inputs]
+        return None if any(column is None for column in columns) else columns
+
+    def sources(self, df: pd.DataFrame) -> List[str]:
+        return [self._resolve_column(df, column) or column
+                for column in (self.schema_sources if self.schema_sources is not None else self.inputs)]
+
+    def describe(self, df: pd.DataFrame, *columns) -> str:
+        return self.transformation(df, *columns) if callable(self.transformation) else self.transformation
+
+def _grouped(df: pd.DataFrame, column: str, keys=()):
+    """The column itself, or the column grouped by `keys` (segments keep their own history)."""
+    if not keys:
+        return df[column]
+    return df.groupby(list(keys), sort=False, observed=True, dropna=False)[column]
+
+def _days_in_period(df: pd.DataFrame):
+    return df['date'].dt.days_in_month.astype(float) if 'date' in df.columns else 30
+
+def _cagr(df: pd.DataFrame, metric: str, year: str, keys=()):
+    """CAGR (%) between the first and last calendar year; None with fewer than 2 years."""
+    if keys:
+        return _segment_cagr(df, metric, year, list(keys))
+    yearly_data = df.groupby(year)[metric].sum()
+    if len(yearly_data) < 2:
+        return None
+    years = len(yearly_data) - 1
+    return ((yearly_data.iloc[-1] / yearly_data.iloc[0]) ** (1/years) - 1) * 100
+
+def _segment_cagr(df: pd.DataFrame, metric: str, year: str, keys: List[str]):
+    """Per-segment CAGR broadcast to the segment's rows; 0 for segments with fewer than 2 years."""
+    yearly_data = df.groupby([*keys, year], sort=False, observed=True, dropna=False)[metric].sum()
+    per_segment = yearly_data.groupby(level=list(range(len(keys))), sort=False, dropna=False).agg(['first', 'last', 'size'])
+    per_segment = per_segment[per_segment['size'] >= 2]
+    if per_segment.empty:
+        return None
+    years = per_segment['size'] - 1
+    rates = ((per_segment['last'] / per_segment['first']) ** (1 / years) - 1) * 100
+    segment_index = pd.MultiIndex.from_frame(df[keys]) if len(keys) > 1 else pd.Index(df[keys[0]])
+    return rates.reindex(segment_index).fillna(0).to_numpy()
+
+def _cagr_incremental(previous: pd.DataFrame, new: pd.DataFrame, metric: str, year: str):
+    """
+    CAGR after appending `new` to the date-sorted `previous` frame. Only the first year's
+    total and the totals of years touched by the new rows are summed (same rows, same
+    order as a full groupby, so the result is bit-identical).
+    """
+    previous_years = previous[year].to_numpy()
+    boundary = int(np.searchsorted(previous_years, new[year].iloc[0], side='left'))
+    untouched_years = previous_years[:boundary]
+    touched_totals = pd.concat(
+        [previous[[year, metric]].iloc[boundary:], new[[year, metric]]], ignore_index=True
+    ).groupby(year)[metric].sum()
+
+    year_count = len(touched_totals) + (int(np.count_nonzero(np.diff(untouched_years))) + 1 if boundary else 0)
+    if year_count < 2:
+        return None
+    if boundary:
+        first_year_end = int(np.searchsorted(previous_years, previous_years[0], side='right'))
+        first_total = previous[[year, metric]].iloc[:first_year_end].groupby(year)[metric].sum().iloc[0]
+    else:
+        first_total = touched_totals.iloc[0]
+    years = year_count - 1
+    return ((touched_totals.iloc[-1] / first_total) ** (1/years) - 1) * 100, f'CAGR over {years} years'
+
+MARKETING_SPEND = ('marketing_spend', 'Marketing Spend')
+
+_KPI_DEFINITIONS = [
+    # ==================== PROFITABILITY METRICS ====================
+    KPIDefinition('profit', ['revenue', 'expenses'], lambda df, rev, exp: df[rev] - df[exp],
+                  'revenue - expenses', only_if_missing=True),
+    KPIDefinition('profit_margin', ['profit', 'revenue', 'expenses'], lambda df, profit, rev, _: safe_ratio(df[profit], df[rev]),
+                  'profit / revenue', schema_sources=['profit', 'revenue']),
+
+    # ==================== COST METRICS ====================
+    KPIDefinition('expense_ratio', ['expenses', 'revenue'], lambda df, exp, rev: safe_ratio(df[exp], df[rev]),
+                  'expenses / revenue'),
+    KPIDefinition('marketing_spend_ratio', ['Marketing Spend', 'revenue'], lambda df, spend, rev: safe_ratio(df[spend], df[rev]),
+                  'marketing_spend / revenue'),
+
+    # ==================== CASH & LIQUIDITY METRICS ====================
+    KPIDefinition('working_capital', ['assets', 'liabilities'], lambda df, assets, liab: df[assets] - df[liab],
+                  'assets - liabilities'),
+    KPIDefinition('current_ratio', ['assets', 'liabilities'], lambda df, assets, liab: safe_ratio(df[assets], df[liab]),
+                  'assets / liabilities'),
+    KPIDefinition('working_capital_ratio', ['working_capital', 'assets', 'liabilities'],
+                  lambda df, wc, assets, _: safe_ratio(df[wc], df[assets]),
+                  'working_capital / assets', schema_sources=['working_capital', 'assets']),
+    KPIDefinition('quick_ratio', ['cashflow', 'ar', 'liabilities'],
+                  lambda df, cash, ar, liab: safe_ratio(df[cash] + df[ar], df[liab]),
+                  '(cashflow + ar) / liabilities'),
+    # Free Cash Flow (approximation using working capital change)
+    KPIDefinition('working_capital_change', ['working_capital', 'cashflow'], lambda df, wc, _, keys=(): _grouped(df, wc, keys).diff().fillna(0),
+                  'diff(working_capital)', kind='window', lookback='previous_row', in_schema=False),
+    KPIDefinition('free_cash_flow', ['cashflow', 'working_capital_change'], lambda df, cash, change: df[cash] - df[change],
+                  'cashflow - working_capital_change', schema_sources=['cashflow', 'working_capital']),
+
+    # ==================== EFFICIENCY METRICS ====================
+    KPIDefinition('ar_turnover', ['revenue', 'ar'], lambda df, rev, ar: safe_ratio(df[rev], df[ar]), 'revenue / ar'),
+    KPIDefinition('dso', ['ar', 'revenue'], lambda df, ar, rev: np.where(df[rev] > 0, (df[ar] / df[rev]) * _days_in_period(df), 0),
+                  '(ar / revenue) * days_in_period', schema_sources=['ar', 'revenue', 'date']),
+    KPIDefinition('ap_turnover', ['expenses', 'ap'], lambda df, exp, ap: safe_ratio(df[exp], df[ap]), 'expenses / ap'),
+    KPIDefinition('dpo', ['ap', 'expenses'], lambda df, ap, exp: np.where(df[exp] > 0, (df[ap] / df[exp]) * _days_in_period(df), 0),
+                  '(ap / expenses) * days_in_period', schema_sources=['ap', 'expenses', 'date']),
+    # CCC = DSO + DIO - DPO, assuming DIO = 0 without inventory data
+    KPIDefinition('cash_conversion_cycle', ['dso', 'dpo'], lambda df, dso, dpo: df[dso] - df[dpo], 'dso - dpo'),
+
+    # ==================== GROWTH METRICS ====================
+    *[KPIDefinition(f'{metric}_mom_growth', [metric], lambda df, m, keys=(): _grouped(df, m, keys).pct_change().fillna(0) * 100,
+                    'pct_change() * 100', kind='window', lookback='previous_row', requires_datetime=True)
+      for metric in ['revenue', 'profit', 'expenses']],
+    KPIDefinition('year', ['date'], lambda df, date: df[date].dt.year, 'date.year', in_schema=False, requires_datetime=True),
+    KPIDefinition('month', ['date'], lambda df, date: df[date].dt.month, 'date.month', in_schema=False, requires_datetime=True),
+    *[KPIDefinition(f'{metric}_yoy_growth', [metric, 'month'],
+                    lambda df, m, month, keys=(): _grouped(df, m, (*keys, month)).pct_change(periods=1).fillna(0) * 100,
+                    'yoy pct_change() * 100', schema_sources=[metric, 'date'], kind='window',
+                    lookback='previous_year', requires_datetime=True)
+      for metric in ['revenue', 'profit']],
+    # CAGR calculation (requires at least 2 years of data)
+    *[KPIDefinition(f'{metric}_cagr', [metric, 'year'], _cagr,
+                    lambda df, m, year: f'CAGR over {df[year].nunique() - 1} years',
+                    schema_sources=[metric, 'date'], kind='aggregate', requires_datetime=True,
+                    incremental=_cagr_incremental)
+      for metric in ['revenue', 'profit']],
+
+    # ==================== RISK & LEVERAGE METRICS ====================
+    KPIDefinition('debt_to_asset_ratio', ['liabilities', 'assets'], lambda df, liab, assets: safe_ratio(df[liab], df[assets]),
+                  'liabilities / assets'),
+    KPIDefinition('equity', ['assets', 'liabilities'], lambda df, assets, liab: df[assets] - df[liab],
+                  'assets - liabilities', in_schema=False),
+    KPIDefinition('debt_to_equity_ratio', ['liabilities', 'equity', 'assets'],
+                  lambda df, liab, equity, _: safe_ratio(df[liab], df[equity]),
+                  'liabilities / equity', schema_sources=['liabilities', 'equity']),
+    KPIDefinition('solvency_ratio', ['profit', 'liabilities'], lambda df, profit, liab: safe_ratio(df[profit], df[liab]),
+                  'profit / liabilities'),
+
+    # ==================== MARKETING EFFICIENCY METRICS ====================
+    KPIDefinition('roas', ['revenue', MARKETING_SPEND], lambda df, rev, spend: safe_ratio(df[rev], df[spend]),
+                  'revenue / marketing_spend'),
+    KPIDefinition('marketing_efficiency', ['profit', MARKETING_SPEND], lambda df, profit, spend: safe_ratio(df[profit], df[spend]),
+                  'profit / marketing_spend'),
+]
+
+# Name -> definition, in a valid evaluation (topological) order
+KPI_GRAPH: Dict[str, KPIDefinition] = {kpi.name: kpi for kpi in _KPI_DEFINITIONS}
 
 class KPIAutoExtractionDynamicFeatureEngineering:
     """
     Automatically extracts and derives 35+ KPIs and financial features from a normalized dataset.
     Comprehensive CFO-level metrics covering profitability, liquidity, efficiency, growth, risk, and marketing.
     """
-    def extract_and_derive_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Dict]]:
+    def __init__(self, compact: bool = None, segment_by: List[str] = None):
+        # Opt-in compact dtypes for the featured frame (FEATURE_COMPACT_DTYPES=true)
+        self.compact = compact if compact is not None else os.getenv("FEATURE_COMPACT_DTYPES", "false").lower() == "true"
+        # Opt-in segmented mode (FEATURE_SEGMENT_BY=region,department): time-dependent KPIs
+        # are computed per segment and the featured frame is pre-partitioned by segment
+        if segment_by is None:
+            segment_by = [col.strip() for col in os.getenv("FEATURE_SEGMENT_BY", "").split(",") if col.strip()]
+        self.segment_by = list(segment_by)
+        self.segment_frames = {}
+        self.memory_report = {}
+        self.kpi_timings = {}
+        self.update_report = {}
+
+    def compact_dtypes(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
         """
-        Derives comprehensive financial KPIs with robust error handling.
-        Returns featured dataframe and schema documenting all derived metrics.
+        Shrinks the dtypes of a featured frame:
+        - low-cardinality text columns (region, department, ...) -> category
+        - ratio KPIs -> float32 when the round trip stays within FLOAT32_RTOL
+        - year/month -> int16/int8
+        Returns the compacted frame and a report of the memory saved.
         """
-        featured_df = df.copy()
-        feature_schema = []
+        bytes_before = int(df.memory_usage(deep=True).sum())
+        conversions = {}
+        compacted = {}
+
+        for col in df.columns:
+            series = df[col]
+            if col in CALENDAR_DTYPES and pd.api.types.is_integer_dtype(series):
+                target = CALENDAR_DTYPES[col]
+                info = np.iinfo(target)
+                if series.empty or (series.min() >= info.min and series.max() <= info.max):
+                    compacted[col] = series.astype(target)
+            elif col in RATIO_KPIS and series.dtype == np.float64:
+                values = series.to_numpy()
+                with np.errstate(over='ignore', invalid='ignore'):
+                    downcast = values.astype(np.float32)
+                    if np.allclose(downcast, values, rtol=FLOAT32_RTOL, atol=0, equal_nan=True):
+                        compacted[col] = pd.Series(downcast, index=series.index, name=col)
+            elif (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)) and len(series):
+                if series.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+                    compacted[col] = series.astype('category')
 
-        def add_feature_to_schema(name, sources, transform_desc):
-            if name in featured_df.columns:
+        for col, series in compacted.items():
+            conversions[col] = f"{df[col].dtype} -> {series.dtype}"
+            df[col] = series
+
+        bytes_after = int(df.memory_usage(deep=True).sum())
+        report = {
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "bytes_saved": bytes_before - bytes_after,
+            "reduction_factor": round(bytes_before / bytes_after, 2) if bytes_after else 1.0,
+            "conversions": conversions
+        }
+        return df, report
+
+    @staticmethod
+    def required_kpis(targets: List[str]) -> List[str]:
+        """KPIs (in evaluation order) needed to produce `targets`, following inputs through the graph."""
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name in needed or name not in KPI_GRAPH:
+                continue
+            needed.add(name)
+            for dependency in KPI_GRAPH[name].inputs:
+                stack.extend(dependency if isinstance(dependency, tuple) else [dependency])
+        return [name for name in KPI_GRAPH if name in needed]
+
+    @staticmethod
+    def partition_segments(featured_df: pd.DataFrame, column) -> Dict[Any, pd.DataFrame]:
+        """
+        Splits a frame into one date-ordered frame per value of `column` in a single groupby pass.
+        A tuple of columns partitions by their combination, keyed by value tuples.
+        """
+        by = list(column) if isinstance(column, tuple) else column
+        groups = featured_df.groupby(by, sort=False, observed=True).indices
+        return {value: featured_df.take(rows) for value, rows in groups.items()}
+
+    def _kpi_names(self, df: pd.DataFrame, targets: Optional[List[str]]) -> List[str]:
+        if targets is not None:
+            unknown = [name for name in targets if name not in KPI_GRAPH and name not in df.columns]
+            if unknown:
+                raise ValueError(f"Unknown KPI targets: {unknown}")
+        return list(KPI_GRAPH) if targets is None else self.required_kpis(targets)
+
+    @staticmethod
+    def _harden(df: pd.DataFrame) -> pd.DataFrame:
+        """Shallow copy with a datetime `date` column, undated rows dropped, sorted by date."""
+        # Shallow copy: KPIs are added as new columns; copy-on-write protects the input frame
+        featured_df = df.copy(deep=False)
+        if 'date' in featured_df.columns:
+            # Ingestion already delivers datetime64; only raw frames need converting
+            if not pd.api.types.is_datetime64_any_dtype(featured_df['date']):
+                featured_df['date'] = pd.to_datetime(featured_df['date'], errors='coerce')
+            featured_df.dropna(subset=['date'], inplace=True)
+            featured_df = sort_by_date(featured_df).reset_index(drop=True)
+        return featured_df
+
+    def _evaluate(self, featured_df: pd.DataFrame, kpi_names: List[str], keys: List[str] = ()) -> List[Dict]:
+        """
+        Adds each computable KPI in `kpi_names` to `featured_df`; returns the schema entries.
+        With segment `keys`, window and aggregate KPIs run as one groupby pass over all segments.
+        """
+        feature_schema = []
+        for name in kpi_names:
+            kpi = KPI_GRAPH[name]
+            columns = kpi.resolve(featured_df)
+            if columns is None:
+                continue
+            started = time.perf_counter()
+            if keys and kpi.kind != 'row':
+                values = kpi.formula(featured_df, *columns, keys=keys)
+            else:
+                values = kpi.formula(featured_df, *columns)
+            if values is None:
+                continue
+            featured_df[name] = values
+            self.kpi_timings[name] = round((time.perf_counter() - started) * 1000, 3)
+            if kpi.in_schema:
                 feature_schema.append({
                     "feature": name,
                     "type": str(featured_df[name].dtype),
-                    "source": sources,
-                    "transformation": transform_desc
+                    "source": kpi.sources(featured_df),
+                    "transformation": kpi.describe(featured_df, *columns)
                 })
+        return feature_schema
 
-        # --- DATA HARDENING ---
-        if 'date' in featured_df.columns:
-            featured_df['date'] = pd.to_datetime(featured_df['date'], errors='coerce')
-            featured_df.dropna(subset=['date'], inplace=True)
-            featured_df = featured_df.sort_values(by='date').reset_index(drop=True)
-
-        # Get days in period for various calculations
-        days_in_period = featured_df['date'].dt.days_in_month.astype(float) if 'date' in featured_df.columns else 30
-
-        # ==================== PROFITABILITY METRICS ====================
-        
-        if 'revenue' in featured_df.columns and 'expenses' in featured_df.columns:
-            # Ensure profit exists
-            if 'profit' not in featured_df.columns:
-                featured_df['profit'] = featured_df['revenue'] - featured_df['expenses']
-                add_feature_to_schema('profit', ['revenue', 'expenses'], 'revenue - expenses')
-            
-            # Profit Margin (also known as Net Profit Margin)
-            featured_df['profit_margin'] = np.where(featured_df['revenue'] > 0, 
-                featured_df['profit'] / featured_df['revenue'], 0)
-            add_feature_to_schema('profit_margin', ['profit', 'revenue'], 'profit / revenue')
-
-        # ==================== COST METRICS ====================
-        
-        if 'revenue' in featured_df.columns and 'expenses' in featured_df.columns:
-            # Expense Ratio
-            featured_df['expense_ratio'] = np.where(featured_df['revenue'] > 0,
-                featured_df['expenses'] / featured_df['revenue'], 0)
-            add_feature_to_schema('expense_ratio', ['expenses', 'revenue'], 'expenses / revenue')
-        
-        if 'Marketing Spend' in featured_df.columns and 'revenue' in featured_df.columns:
-            # Marketing Spend Ratio
-            featured_df['marketing_spend_ratio'] = np.where(featured_df['revenue'] > 0,
-                featured_df['Marketing Spend'] / featured_df['revenue'], 0)
-            add_feature_to_schema('marketing_spend_ratio', ['Marketing Spend', 'revenue'], 
-                'marketing_spend / revenue')
-
-        # ==================== CASH & LIQUIDITY METRICS ====================
-        
-        if 'assets' in featured_df.columns and 'liabilities' in featured_df.columns:
-            # Working Capital
-            featured_df['working_capital'] = featured_df['assets'] - featured_df['liabilities']
-            add_feature_to_schema('working_capital', ['assets', 'liabilities'], 'assets - liabilities')
-            
-            # Current Ratio
-            featured_df['current_ratio'] = np.where(featured_df['liabilities'] > 0,
-                featured_df['assets'] / featured_df['liabilities'], 0)
-            add_feature_to_schema('current_ratio', ['assets', 'liabilities'], 'assets / liabilities')
-            
-            # Working Capital Ratio
-            featured_df['working_capital_ratio'] = np.where(featured_df['assets'] > 0,
-                featured_df['working_capital'] / featured_df['assets'], 0)
-            add_feature_to_schema('working_capital_ratio', ['working_capital', 'assets'], 
-                'working_capital / assets')
-        
-        if 'cashflow' in featured_df.columns and 'ar' in featured_df.columns and 'liabilities' in featured_df.columns:
-            # Quick Ratio
-            featured_df['quick_ratio'] = np.where(featured_df['liabilities'] > 0,
-                (featured_df['cashflow'] + featured_df['ar']) / featured_df['liabilities'], 0)
-            add_feature_to_schema('quick_ratio', ['cashflow', 'ar', 'liabilities'], 
-                '(cashflow + ar) / liabilities')
-        
-        if 'cashflow' in featured_df.columns and 'working_capital' in featured_df.columns:
-            # Free Cash Flow (approximation using working capital change)
-            featured_df['working_capital_change'] = featured_df['working_capital'].diff().fillna(0)
-            featured_df['free_cash_flow'] = featured_df['cashflow'] - featured_df['working_capital_change']
-            add_feature_to_schema('free_cash_flow', ['cashflow', 'working_capital'], 
-                'cashflow - working_capital_change')
-
-        # ==================== EFFICIENCY METRICS ====================
-        
-        if 'ar' in featured_df.columns and 'revenue' in featured_df.columns:
-            # AR Turnover
-            featured_df['ar_turnover'] = np.where(featured_df['ar'] > 0,
-                featured_df['revenue'] / featured_df['ar'], 0)
-            add_feature_to_schema('ar_turnover', ['revenue', 'ar'], 'revenue / ar')
-            
-            # DSO (Days Sales Outstanding)
-            featured_df['dso'] = np.where(featured_df['revenue'] > 0,
-                (featured_df['ar'] / featured_df['revenue']) * days_in_period, 0)
-            add_feature_to_schema('dso', ['ar', 'revenue', 'date'], 
-                '(ar / revenue) * days_in_period')
-        
-        if 'ap' in featured_df.columns and 'expenses' in featured_df.columns:
-            # AP Turnover
-            featured_df['ap_turnover'] = np.where(featured_df['ap'] > 0,
-                featured_df['expenses'] / featured_df['ap'], 0)
-            add_feature_to_schema('ap_turnover', ['expenses', 'ap'], 'expenses / ap')
-            
-            # DPO (Days Payable Outstanding)
-            featured_df['dpo'] = np.where(featured_df['expenses'] > 0,
-                (featured_df['ap'] / featured_df['expenses']) * days_in_period, 0)
-            add_feature_to_schema('dpo', ['ap', 'expenses', 'date'], 
-                '(ap / expenses) * days_in_period')
-        
-        # Cash Conversion Cycle (CCC = DSO + DIO - DPO, assuming DIO = 0 without inventory data)
-        if 'dso' in featured_df.columns and 'dpo' in featured_df.columns:
-            featured_df['cash_conversion_cycle'] = featured_df['dso'] - featured_df['dpo']
-            add_feature_to_schema('cash_conversion_cycle', ['dso', 'dpo'], 'dso - dpo')
-
-        # ==================== GROWTH METRICS ====================
-        
-        if 'date' in featured_df.columns and pd.api.types.is_datetime64_any_dtype(featured_df['date']):
-            # Month-over-Month Growth
-            for metric in ['revenue', 'profit', 'expenses']:
-                if metric in featured_df.columns:
-                    col_name = f'{metric}_mom_growth'
-                    featured_df[col_name] = featured_df[metric].pct_change().fillna(0) * 100
-                    add_feature_to_schema(col_name, [metric], 'pct_change() * 100')
-            
-            # Year-over-Year Growth
-            featured_df['year'] = featured_df['date'].dt.year
-            featured_df['month'] = featured_df['date'].dt.month
-            
-            for metric in ['revenue', 'profit']:
-                if metric in featured_df.columns:
-                    col_name = f'{metric}_yoy_growth'
-                    featured_df[col_name] = featured_df.groupby('month')[metric].pct_change(periods=1).fillna(0) * 100
-                    add_feature_to_schema(col_name, [metric, 'date'], 'yoy pct_change() * 100')
-            
-            # CAGR calculation (requires at least 2 years of data)
-            for metric in ['revenue', 'profit']:
-                if metric in featured_df.columns:
-                    yearly_data = featured_df.groupby('year')[metric].sum()
-                    if len(yearly_data) >= 2:
-                        years = len(yearly_data) - 1
-                        cagr = ((yearly_data.iloc[-1] / yearly_data.iloc[0]) ** (1/years) - 1) * 100
-                        featured_df[f'{metric}_cagr'] = cagr
-                        add_feature_to_schema(f'{metric}_cagr', [metric, 'date'], 
-                            f'CAGR over {years} years')
-
-        # ==================== RISK & LEVERAGE METRICS ====================
-        
-        if 'assets' in featured_df.columns and 'liabilities' in featured_df.columns:
-            # Debt-to-Asset Ratio
-            featured_df['debt_to_asset_ratio'] = np.where(featured_df['assets'] > 0,
-                featured_df['liabilities'] / featured_df['assets'], 0)
-            add_feature_to_schema('debt_to_asset_ratio', ['liabilities', 'assets'], 
-                'liabilities / assets')
-            
-            # Equity
-            featured_df['equity'] = featured_df['assets'] - featured_df['liabilities']
-            
-            # Debt-to-Equity Ratio
-            featured_df['debt_to_equity_ratio'] = np.where(featured_df['equity'] > 0,
-                featured_df['liabilities'] / featured_df['equity'], 0)
-            add_feature_to_schema('debt_to_equity_ratio', ['liabilities', 'equity'], 
-                'liabilities / equity')
-        
-        if 'profit' in featured_df.columns and 'liabilities' in featured_df.columns:
-            # Solvency Ratio
-            featured_df['solvency_ratio'] = np.where(featured_df['liabilities'] > 0,
-                featured_df['profit'] / featured_df['liabilities'], 0)
-            add_feature_to_schema('solvency_ratio', ['profit', 'liabilities'], 
-                'profit / liabilities')
-
-        # ==================== MARKETING EFFICIENCY METRICS ====================
-        
-        # Check for marketing_spend column (normalized name) or Marketing Spend (original)
-        marketing_col = 'marketing_spend' if 'marketing_spend' in featured_df.columns else 'Marketing Spend'
-        
-        if marketing_col in featured_df.columns:
-            if 'revenue' in featured_df.columns:
-                # ROAS (Return on Ad Spend)
-                featured_df['roas'] = np.where(featured_df[marketing_col] > 0,
-                    featured_df['revenue'] / featured_df[marketing_col], 0)
-                add_feature_to_schema('roas', ['revenue', marketing_col], 
-                    'revenue / marketing_spend')
-            
-            if 'profit' in featured_df.columns:
-                # Marketing Efficiency Ratio
-                featured_df['marketing_efficiency'] = np.where(featured_df[marketing_col] > 0,
-                    featured_df['profit'] / featured_df[marketing_col], 0)
-                add_feature_to_schema('marketing_efficiency', ['profit', marketing_col], 
-                    'profit / marketing_spend')
-
-        # Fill any remaining NaNs
-        numeric_cols = featured_df.select_dtypes(include=[np.number]).columns
-        featured_df[numeric_cols] = featured_df[numeric_cols].fillna(0)
-        
-        return featured_df, feature_schema
\ No newline at end of file
+    @staticmethod
+    def _fill_missing(featured_df: pd.DataFrame):
+        """Fills any remaining NaNs in numeric columns with 0."""
+        numeric_cols = [col for col in featured_df.select_dtypes(include=[np.number]).columns if featured_df[col].hasnans]
+        if numeric_cols:
+            featured_df[numeric_cols] = featured_df[numeric_cols].fillna(0)
+
+    def extract_and_derive_features(self, df: pd.DataFrame, targets: List[str] = None) -> Tuple[pd.DataFrame, List[Dict]]:
+        """
+        Derives comprehensive financial KPIs with robust error handling.
+        Returns featured dataframe and schema documenting all derived metrics.
+
+        KPIs are evaluated from KPI_GRAPH; with `targets`, only the sub-graph those KPIs
+        depend on is computed. Per-KPI wall time (ms) is recorded in `kpi_timings`.
+        With compact mode on, dtypes are shrunk afterwards and `memory_report` records the savings.
+        In segmented mode (`segment_by`), MoM/YoY/working-capital change and CAGR are computed
+        within each segment. `segment_frames[column][value]` holds the rows of each value of every
+        segment column (what per-region/per-department forecasts consume); with several columns,
+        `segment_frames[tuple(columns)][values]` also holds each combination's rows, the groups
+        the window KPIs were computed in.
+        """
+        kpi_names = self._kpi_names(df, targets)
+        featured_df = self._harden(df)
+        self.kpi_timings = {}
+        segment_keys = [col for col in self.segment_by if col in featured_df.columns]
+        feature_schema = self._evaluate(featured_df, kpi_names, segment_keys)
+        self._fill_missing(featured_df)
+
+        self.memory_report = {}
+        if self.compact:
+            featured_df, self.memory_report = self.compact_dtypes(featured_df)
+            for entry in feature_schema:
+                entry["type"] = str(featured_df[entry["feature"]].dtype)
+
+        self.segment_frames = {col: self.partition_segments(featured_df, col) for col in segment_keys}
+        if len(segment_keys) > 1:
+            self.segment_frames[tuple(segment_keys)] = self.partition_segments(featured_df, tuple(segment_keys))
+
+        return featured_df, feature_schema
+
+    @staticmethod
+    def _context_rows(dates: pd.Series, new_months: np.ndarray, lookbacks: set) -> List[int]:
+        """
+        Positions of the previous rows the new rows look back to: the last row for
+        'previous_row' KPIs, and the last row of each calendar month in `new_months`
+        for 'previous_year' KPIs (searched in the trailing year first).
+        """
+        rows = {len(dates) - 1}
+        if 'previous_year' in lookbacks:
+            needed, found = set(new_months.tolist()), {}
+            trailing_start = int(np.searchsorted(dates.to_numpy(), (dates.iloc[-1] - pd.DateOffset(years=1)).to_datetime64()))
+            for block_start in (trailing_start, 0):
+                months = dates.iloc[block_start:].dt.month.to_numpy()
+                for month in needed - found.keys():
+                    hits = np.flatnonzero(months == month)
+                    if len(hits):
+                        found[month] = block_start + int(hits[-1])
+                if len(found) == len(needed) or block_start == 0:
+                    break
+            rows.update(found.values())
+        return sorted(rows)
+
+    def _recompute(self, featured_df: pd.DataFrame, source_cols: List[str], new_rows: pd.DataFrame,
+                   targets: Optional[List[str]], reason: str) -> Tuple[pd.DataFrame, List[Dict]]:
+        raw_df = pd.concat([featured_df[source_cols], new_rows], ignore_index=True)
+        result = self.extract_and_derive_features(raw_df, targets)
+        self.update_report = {"mode": "full", "reason": reason, "new_rows": len(new_rows)}
+        return result
+
+    def update_features(self, featured_df: pd.DataFrame, new_rows: pd.DataFrame,
+                        targets: List[str] = None) -> Tuple[pd.DataFrame, List[Dict]]:
+        """
+        Appends `new_rows` (raw, same columns as the original input) to a frame previously
+        returned by extract_and_derive_features, recomputing KPIs only for the new rows.
+
+        Row KPIs see only the new rows; window KPIs also see their lookback rows (the last
+        previous row for MoM, the last previous row of the same month for YoY); aggregate
+        KPIs (CAGR) are refreshed from the first and the touched year totals. The result
+        equals extract_and_derive_features(concat(original_input, new_rows), targets) when
+        the original input had no missing values. Anything the trailing window cannot
+        reproduce (back-dated rows, changed columns, newly computable KPIs, compact dtypes)
+        falls back to a full recompute; `update_report` records which path was taken.
+        """
+        kpi_names = self._kpi_names(featured_df, targets)
+        derived_cols = [col for col in featured_df.columns if col in KPI_GRAPH and col not in new_rows.columns]
+        source_cols = [col for col in featured_df.columns if col not in derived_cols]
+
+        if self.compact or any(col in featured_df.columns for col in self.segment_by):
+            return self._recompute(featured_df, source_cols, new_rows, targets, "compact dtypes or segmented mode")
+        if featured_df.empty or 'date' not in featured_df.columns \
+                or not pd.api.types.is_datetime64_any_dtype(featured_df['date']):
+            return self._recompute(featured_df, source_cols, new_rows, targets, "no dated history")
+        if set(new_rows.columns) != set(source_cols):
+            return self._recompute(featured_df, source_cols, new_rows, targets, "columns changed")
+        new_df = self._harden(new_rows[source_cols])
+        if new_df.empty or new_df['date'].iloc[0] < featured_df['date'].iloc[-1]:
+            return self._recompute(featured_df, source_cols, new_rows, targets, "rows not appended after history")
+
+        lookbacks = {KPI_GRAPH[name].lookback for name in derived_cols}
+        context = self._context_rows(featured_df['date'], new_df['date'].dt.month.unique(), lookbacks)
+        window_df = pd.concat([featured_df[source_cols].iloc[context], new_df], ignore_index=True)
+
+        self.kpi_timings = {}
+        row_kpis = [name for name in kpi_names if KPI_GRAPH[name].kind != 'aggregate']
+        schema = {entry["feature"]: entry for entry in self._evaluate(window_df, row_kpis)}
+        new_featured = window_df.iloc[len(context):].reset_index(drop=True)
+
+        aggregates = {}
+        for name in kpi_names:
+            kpi = KPI_GRAPH[name]
+            columns = kpi.resolve(new_featured) if kpi.kind == 'aggregate' else None
+            if columns is None:
+                continue
+            if kpi.incremental is None or any(col not in featured_df.columns for col in columns):
+                return self._recompute(featured_df, source_cols, new_rows, targets, f"{name} needs full history")
+            started = time.perf_counter()
+            result = kpi.incremental(featured_df, new_featured, *columns)
+            if result is None:
+                continue
+            aggregates[name] = result[0]
+            self.kpi_timings[name] = round((time.perf_counter() - started) * 1000, 3)
+            if kpi.in_schema:
+                schema[name] = {"feature": name, "source": kpi.sources(new_featured), "transformation": result[1]}
+
+        computed = [name for name in kpi_names
+                    if (name in new_featured.columns and name not in source_cols) or name in aggregates]
+        if computed != derived_cols:
+            return self._recompute(featured_df, source_cols, new_rows, targets, "computable KPIs changed")
+
+        self._fill_missing(new_featured)
+        for name in aggregates:
+            new_featured[name] = np.nan
+        updated_df = pd.concat([featured_df, new_featured[featured_df.columns]], ignore_index=True)
+        for name, value in aggregates.items():
+            updated_df[name] = value
+            if updated_df[name].hasnans:
+                updated_df[name] = updated_df[name].fillna(0)
+
+        feature_schema = []
+        for name in derived_cols:
+            if name in schema:
+                entry = schema[name]
+                feature_schema.append({"feature": name, "type": str(updated_df[name].dtype),
+                                       "source": entry["source"], "transformation": entry["transformation"]})
+        self.memory_report = {}
+        self.update_report = {"mode": "incremental", "new_rows": len(new_df), "context_rows": len(context)}
+        return updated_df, feature_schema
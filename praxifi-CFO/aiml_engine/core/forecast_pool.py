@@ -0,0 +1,165 @@
+"""
+App-Lifetime Forecasting Worker Pool
+
+One process pool shared by every request, created at API startup and shut down
+with the app, instead of three short-lived ProcessPoolExecutors per report.
+
+- Workers start from a forkserver that has pre-imported only this module and
+  the forecasting stack (pandas, Prophet/cmdstanpy, statsmodels), so they never
+  inherit the API process' spaCy model or agent state and pay no import cost
+  per request
+- Pool size: FORECAST_POOL_WORKERS (default: CPU count)
+- Start method: FORECAST_POOL_START_METHOD ('forkserver' by default, 'spawn'
+  where forkserver is unavailable)
+- A pool broken by a crashed worker is replaced on next use
+
+The worker functions live here (not in the API module) so that unpickling a job
+in a worker imports nothing beyond the forecasting stack.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import pandas as pd
+
+from aiml_engine.core.forecastability import forecastability
+from aiml_engine.core.forecasting import ForecastingModule
+from aiml_engine.core.frame_handoff import FrameHandle, load_frame
+from aiml_engine.utils.helpers import enable_copy_on_write
+
+# Minimum rows and backtest accuracy for a regional/departmental forecast to be reported
+SEGMENT_MIN_ROWS = 30
+SEGMENT_MIN_ACCURACY = 85
+
+
+def _init_worker():
+    """Runs once per worker process."""
+    enable_copy_on_write()
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+    logging.getLogger('cmdstanpy').setLevel(logging.ERROR)
+
+
+def forecast_metric(metric: str, frame: FrameHandle) -> tuple:
+    """
+    Forecasts one metric of the published frame.
+    Returns (metric_name, forecast, model_health)
+    """
+    try:
+        # Map only the two columns this forecast needs
+        df = load_frame(frame, columns=['date', metric])
+        forecast, model_health = ForecastingModule(metric=metric).generate_forecast(df)
+        return (metric, forecast, model_health)
+    except Exception as e:
+        # Return empty forecast on failure
+        return (metric, [], {"status": "Failed", "reason": str(e)})
+
+
+def screen_segment(df_segment: pd.DataFrame, metric: str = 'revenue') -> Optional[str]:
+    """
+    Parent-side check run before a segment is dispatched: returns why the segment's forecast
+    would be discarded (too little history, or a series too noisy to reach
+    SEGMENT_MIN_ACCURACY, see forecastability), or None when it is worth a fit.
+    """
+    if metric not in df_segment.columns:
+        return f"No '{metric}' column"
+    # Segment data is often noisier than overall metrics: require 30+ rows
+    if len(df_segment) < SEGMENT_MIN_ROWS:
+        return f"Not enough data ({len(df_segment)} rows). Need at least {SEGMENT_MIN_ROWS} rows."
+    monthly = ForecastingModule(metric=metric).monthly_series(df_segment)
+    scores = forecastability(monthly.to_numpy())
+    if not scores["forecastable"]:
+        return (f"Unforecastable series (spectral entropy {scores['spectral_entropy']:.2f}, "
+                f"detrended CV {scores['coefficient_of_variation']:.2f})")
+    return None
+
+
+def forecast_segment(segment, frame: FrameHandle, metric: str = 'revenue') -> tuple:
+    """
+    Forecasts `metric` for one region/department, published on its own (see screen_segment).
+    Returns (segment, forecast, success_flag)
+    """
+    try:
+        df_segment = load_frame(frame, columns=['date', metric])
+        forecast, model_health = ForecastingModule(metric=metric).generate_forecast(df_segment)
+        # Only return forecast if it's successful and doesn't have negative values
+        if forecast and model_health.get('status') == 'Success':
+            # Check for unrealistic negative forecasts (revenue shouldn't be negative)
+            has_negative = any(f.get('predicted', 0) < 0 for f in forecast if isinstance(f, dict))
+            # Strict accuracy threshold - segment forecasts must be highly accurate
+            accuracy = model_health.get('accuracy_percentage', 0)
+            if not has_negative and accuracy >= SEGMENT_MIN_ACCURACY:
+                return (segment, forecast, True)
+        return (segment, [], False)
+    except Exception:
+        return (segment, [], False)
+
+
+_global_forecast_pool = None
+_global_forecast_pool_workers = 0
+_forecast_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    method = os.getenv("FORECAST_POOL_START_METHOD", "forkserver")
+    if method not in multiprocessing.get_all_start_methods():
+        method = "spawn"
+    context = multiprocessing.get_context(method)
+    if method == "forkserver":
+        # The forkserver imports the forecasting stack once; every worker forks from it warm
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+def start_forecast_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Creates the shared pool if needed (called at API startup) and returns it."""
+    global _global_forecast_pool, _global_forecast_pool_workers
+    with _forecast_pool_lock:
+        if _global_forecast_pool is None:
+            workers = max_workers or int(os.getenv("FORECAST_POOL_WORKERS", str(multiprocessing.cpu_count())))
+            _global_forecast_pool_workers = max(1, workers)
+            _global_forecast_pool = ProcessPoolExecutor(
+                max_workers=_global_forecast_pool_workers, mp_context=_mp_context(), initializer=_init_worker
+            )
+            # Workers start on first submit: do it now so the first request's budget is not spent on startup
+            _global_forecast_pool.submit(_init_worker)
+        return _global_forecast_pool
+
+
+def forecast_pool_workers() -> int:
+    """Number of worker processes of the shared pool (starting it if needed)."""
+    get_forecast_pool()
+    return _global_forecast_pool_workers
+
+
+def get_forecast_pool() -> ProcessPoolExecutor:
+    """Get the shared pool, starting it lazily outside the API (scripts, tests)."""
+    return _global_forecast_pool or start_forecast_pool()
+
+
+def shutdown_forecast_pool(wait: bool = True):
+    """Stops the shared pool, cancelling queued jobs (called at API shutdown)."""
+    global _global_forecast_pool
+    with _forecast_pool_lock:
+        pool, _global_forecast_pool = _global_forecast_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def discard_broken_pool(pool: ProcessPoolExecutor):
+    """Drops `pool` if it is still the shared one, so the next caller gets a fresh pool."""
+    global _global_forecast_pool
+    with _forecast_pool_lock:
+        if _global_forecast_pool is pool:
+            _global_forecast_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = [
+    "BrokenProcessPool", "forecast_metric", "screen_segment", "forecast_segment", "start_forecast_pool",
+    "get_forecast_pool", "forecast_pool_workers", "shutdown_forecast_pool", "discard_broken_pool",
+]
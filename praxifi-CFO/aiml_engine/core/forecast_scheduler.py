@@ -0,0 +1,112 @@
+"""
+Deadline-Aware Forecasting Scheduler
+
+Runs forecasting jobs on the shared worker pool within a per-request time
+budget, instead of waiting on `as_completed` for every job to finish.
+
+- Jobs are started in priority order: core metrics, then efficiency/ratio
+  metrics, then regions and departments
+- Only as many jobs as the pool has workers are in flight at once; the rest
+  wait in the scheduler, so they can still be dropped at the deadline and the
+  request does not flood the pool shared with other requests
+- At the deadline, finished results are returned and every unfinished job is
+  reported as deferred. A job already running in a worker cannot be
+  interrupted; it finishes in the background and its result is discarded
+- Budget: FORECAST_TIME_BUDGET_SECONDS (default 120, 0 = no deadline)
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from aiml_engine.core.forecast_pool import (
+    BrokenProcessPool, discard_broken_pool, forecast_pool_workers, get_forecast_pool
+)
+
+PRIORITY_CORE = 0
+PRIORITY_SECONDARY = 1
+PRIORITY_SEGMENT = 2
+
+
+@dataclass(frozen=True)
+class ForecastJob:
+    """One call worker(*args) on the pool; `key` identifies its result."""
+    key: Hashable
+    worker: Callable
+    args: tuple
+    priority: int = PRIORITY_CORE
+
+
+@dataclass
+class ScheduleResult:
+    results: Dict[Hashable, Any] = field(default_factory=dict)
+    deferred: List[Hashable] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+
+def default_budget_seconds() -> Optional[float]:
+    budget = float(os.getenv("FORECAST_TIME_BUDGET_SECONDS", "120"))
+    return budget if budget > 0 else None
+
+
+class ForecastScheduler:
+    def __init__(self, budget_seconds: Optional[float] = None, max_in_flight: Optional[int] = None):
+        """
+        Args:
+            budget_seconds: Wall-clock budget for `run` (FORECAST_TIME_BUDGET_SECONDS if None;
+                            0 or less means no deadline)
+            max_in_flight: Jobs submitted to the pool at once (default: pool size)
+        """
+        if budget_seconds is None:
+            budget_seconds = default_budget_seconds()
+        self.budget_seconds = budget_seconds if budget_seconds and budget_seconds > 0 else None
+        self.max_in_flight = max_in_flight
+        self._deadline = None
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Time left before the deadline of the current/last run (None without a deadline)."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def run(self, jobs: List[ForecastJob]) -> ScheduleResult:
+        """Runs `jobs` until all finish or the budget runs out, whichever comes first."""
+        started = time.monotonic()
+        self._deadline = started + self.budget_seconds if self.budget_seconds else None
+        max_in_flight = max(1, self.max_in_flight or forecast_pool_workers())
+        queue = sorted(jobs, key=lambda job: job.priority)  # stable: keeps caller order within a priority
+        in_flight = {}
+        outcome = ScheduleResult()
+        retried = False
+
+        while queue or in_flight:
+            pool = get_forecast_pool()
+            try:
+                while queue and len(in_flight) < max_in_flight:
+                    job = queue.pop(0)
+                    in_flight[pool.submit(job.worker, *job.args)] = job
+                timeout = self.remaining_seconds()
+                if timeout == 0:
+                    break
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    outcome.results[in_flight[future].key] = future.result()
+                    del in_flight[future]
+            except BrokenProcessPool:
+                # A crashed worker takes the pool down: start a fresh one and resubmit once
+                if retried:
+                    raise
+                retried = True
+                discard_broken_pool(pool)
+                queue = sorted([*in_flight.values(), *queue], key=lambda job: job.priority)
+                in_flight = {}
+
+        for future in in_flight:
+            future.cancel()
+        outcome.deferred = [job.key for job in (*in_flight.values(), *queue)]
+        outcome.elapsed_seconds = time.monotonic() - started
+        return outcome
@@ -0,0 +1,111 @@
+"""
+Zero-Copy DataFrame Handoff to Worker Processes
+
+The parent publishes a DataFrame once as an uncompressed Arrow IPC (Feather v2)
+file in tmpfs; workers memory-map it and materialize only the columns and rows
+they need, instead of every worker parsing a JSON dump of the whole frame.
+
+- The file lives in FRAME_HANDOFF_DIR (default /dev/shm, i.e. RAM, when present)
+  and is created with owner-only permissions
+- The handle passed to workers is a small picklable object (path + column names)
+- The parent removes the file when the `published_frame` block exits
+- Without pyarrow, for frames Arrow cannot represent, or when the file cannot be
+  written (e.g. a full /dev/shm, 64 MB by default in Docker: raise the container's
+  shm_size or point FRAME_HANDOFF_DIR elsewhere), the handle carries the JSON dump
+  instead and workers fall back to pd.read_json
+"""
+
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+
+@dataclass(frozen=True)
+class FrameHandle:
+    """Reference to a published frame: an Arrow file path, or a JSON payload as fallback."""
+    columns: Tuple[str, ...]
+    path: Optional[str] = None
+    payload_json: Optional[str] = None
+
+
+def _handoff_dir() -> str:
+    default = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.getenv("FRAME_HANDOFF_DIR", default)
+
+
+def publish_frame(df: pd.DataFrame) -> FrameHandle:
+    """Writes `df` once for worker processes; see `published_frame` for automatic cleanup."""
+    columns = tuple(str(col) for col in df.columns)
+    if pa is not None:
+        path = None
+        try:
+            fd, path = tempfile.mkstemp(prefix="praxifi_frame_", suffix=".arrow", dir=_handoff_dir())
+            with os.fdopen(fd, "wb") as sink:
+                feather.write_feather(df.reset_index(drop=True), sink, compression="uncompressed")
+            return FrameHandle(columns=columns, path=path)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, ValueError, TypeError, OSError):
+            # Columns Arrow cannot represent, or no room in the handoff dir: hand off as JSON instead
+            if path is not None:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    return FrameHandle(columns=columns, payload_json=df.to_json(date_format='iso'))
+
+
+def release_frame(handle: FrameHandle):
+    if handle.path is not None:
+        try:
+            os.remove(handle.path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def published_frame(df: pd.DataFrame) -> Iterator[FrameHandle]:
+    """Publishes `df` for the duration of the block and removes it afterwards."""
+    handle = publish_frame(df)
+    try:
+        yield handle
+    finally:
+        release_frame(handle)
+
+
+def load_frame(handle: FrameHandle, columns: Optional[List[str]] = None,
+               where: Optional[Tuple[str, Any]] = None) -> pd.DataFrame:
+    """
+    Materializes a published frame in a worker: only `columns` (all by default) and,
+    with `where=(column, value)`, only the rows where column == value.
+    """
+    if handle.path is None:
+        df = pd.read_json(io.StringIO(handle.payload_json))
+        if where is not None:
+            df = df[df[where[0]] == where[1]]
+        return df[columns] if columns is not None else df
+
+    # Memory-mapped read: untouched columns are never paged in
+    read_columns = columns
+    if columns is not None and where is not None and where[0] not in columns:
+        read_columns = [*columns, where[0]]
+    table = feather.read_table(handle.path, columns=read_columns, memory_map=True)
+    if where is not None:
+        column, value = where
+        keys = table.column(column)
+        if pa.types.is_dictionary(keys.type):
+            keys = pc.cast(keys, keys.type.value_type)
+        table = table.filter(pc.equal(keys, pa.scalar(value)))
+        if read_columns is not columns:
+            table = table.select(columns)
+    return table.to_pandas()
@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Any
 
+from aiml_engine.utils.helpers import sort_by_date
+
 class NarrativeGenerationModule:
     """
     Generates comprehensive analyst-level narratives with 15+ intelligent insights.
@@ -28,7 +30,7 @@ class NarrativeGenerationModule:
         
         # Liability Growth Warning
         if 'liabilities' in df.columns and 'date' in df.columns:
-            df_sorted = df.sort_values('date')
+            df_sorted = sort_by_date(df)
             liability_trend = df_sorted['liabilities'].tail(6).pct_change().mean() * 100
             if liability_trend > 2:
                 insights.append(
@@ -38,7 +40,7 @@ class NarrativeGenerationModule:
         
         # AR Collection Slowdown
         if 'ar' in df.columns and 'revenue' in df.columns and 'date' in df.columns:
-            df_sorted = df.sort_values('date')
+            df_sorted = sort_by_date(df)
             if len(df_sorted) >= 6:
                 recent_ar_growth = df_sorted['ar'].tail(6).pct_change().mean() * 100
                 recent_rev_growth = df_sorted['revenue'].tail(6).pct_change().mean() * 100
@@ -63,7 +65,7 @@ class NarrativeGenerationModule:
         
         # Margin Compression Risk
         if 'expenses' in df.columns and 'revenue' in df.columns and 'date' in df.columns:
-            df_sorted = df.sort_values('date')
+            df_sorted = sort_by_date(df)
             if len(df_sorted) >= 12:
                 recent_expense_growth = df_sorted['expenses'].tail(12).pct_change().mean() * 100
                 recent_revenue_growth = df_sorted['revenue'].tail(12).pct_change().mean() * 100
@@ -75,7 +77,7 @@ class NarrativeGenerationModule:
         
         # AP vs Expenses Liquidity Pressure
         if 'ap' in df.columns and 'expenses' in df.columns and 'date' in df.columns:
-            df_sorted = df.sort_values('date')
+            df_sorted = sort_by_date(df)
             if len(df_sorted) >= 6:
                 recent_ap_change = df_sorted['ap'].tail(6).pct_change().mean() * 100
                 recent_expense_change = df_sorted['expenses'].tail(6).pct_change().mean() * 100
@@ -127,7 +129,7 @@ class NarrativeGenerationModule:
         
         # Equity Position
         if 'equity' in df.columns and 'date' in df.columns:
-            df_sorted = df.sort_values('date')
+            df_sorted = sort_by_date(df)
             if len(df_sorted) >= 6:
                 equity_trend = df_sorted['equity'].tail(6).pct_change().mean() * 100
                 if equity_trend < -2:
@@ -0,0 +1,99 @@
+"""
+Forecast Reconciliation for Hierarchies
+
+Makes forecasts of a hierarchy (total -> regions/departments -> their
+combinations) coherent, i.e. every aggregate equals the sum of its parts, from
+base forecasts of a single level or of every node.
+
+Notation: the bottom level has m series, the hierarchy n nodes. The summing
+matrix S (n x m) maps bottom series to every node. Each method is a matrix P
+(m x k) mapping the k base forecasts to bottom forecasts, and the coherent
+forecasts of all nodes are S @ P @ base. All methods are one matrix product
+for every horizon at once.
+
+Methods:
+- bottom_up: base forecasts of the bottom series only; P = I
+- top_down:  a base forecast of the total only, split by historical
+             proportions (proportions of the historical averages); P = p
+- mint:      base forecasts of every node combined by minimum-trace (MinT)
+             reconciliation with a diagonal (WLS) error covariance W taken from
+             each base forecast's one-step variance:
+             P = (S' W^-1 S)^-1 S' W^-1
+
+Interval variances are propagated as diag(S P Sigma P' S') with Sigma the
+(diagonal) base forecast variances at each horizon.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+RECONCILIATION_METHODS = ("bottom_up", "top_down", "mint")
+# Relative floor on MinT weights so that exactly-fitted (zero-variance) series keep W invertible
+MIN_VARIANCE_FRACTION = 1e-6
+
+
+def summing_matrix(bottom: pd.DataFrame, group_cols: Sequence[str]) -> Tuple[np.ndarray, List[Tuple[str, object]], np.ndarray]:
+    """
+    Hierarchy over the bottom series `bottom` (one row per series, one column per grouping).
+    Returns (S, nodes, bottom_rows): nodes are ('total', 'total') then (column, value) for every
+    grouping value, then ('cell', row tuple) for the bottom series when there is more than one
+    grouping; bottom_rows are the indices of the bottom series' own nodes.
+    """
+    m = len(bottom)
+    blocks, nodes = [np.ones((1, m))], [('total', 'total')]
+    for col in group_cols:
+        labels = bottom[col].to_numpy()
+        values = pd.unique(labels)
+        blocks.append((labels[None, :] == values[:, None]).astype(np.float64))
+        nodes.extend((col, value) for value in values)
+    if len(group_cols) > 1:
+        blocks.append(np.eye(m))
+        nodes.extend(('cell', tuple(row)) for row in bottom[list(group_cols)].itertuples(index=False))
+        bottom_rows = np.arange(len(nodes) - m, len(nodes))
+    else:
+        # A single grouping is its own bottom level (its indicator block is the identity)
+        bottom_rows = np.arange(1, 1 + m)
+    return np.vstack(blocks), nodes, bottom_rows
+
+
+def historical_proportions(bottom_history: np.ndarray, window: int = 12) -> np.ndarray:
+    """Each bottom series' share of the total over the last `window` periods (bottom x time input)."""
+    recent = bottom_history[:, -window:]
+    total = recent.sum()
+    if total == 0:
+        return np.full(len(bottom_history), 1 / len(bottom_history))
+    return recent.sum(axis=1) / total
+
+
+def reconciliation_matrix(method: str, S: np.ndarray, bottom_rows: np.ndarray,
+                          base_variance: np.ndarray = None, proportions: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (P, base_rows): the m x k matrix P and the k nodes whose base forecasts it takes.
+    `base_variance` (one-step variance of every node's base forecast) is required for 'mint',
+    `proportions` for 'top_down'.
+    """
+    m = S.shape[1]
+    if method == "bottom_up":
+        return np.eye(m), bottom_rows
+    if method == "top_down":
+        return np.asarray(proportions, dtype=np.float64).reshape(m, 1), np.array([0])
+    if method == "mint":
+        variance = np.asarray(base_variance, dtype=np.float64)
+        variance = np.maximum(variance, MIN_VARIANCE_FRACTION * max(variance.mean(), 1e-12))
+        weighted = S.T / variance  # S' W^-1
+        return np.linalg.solve(weighted @ S, weighted), np.arange(S.shape[0])
+    raise ValueError(f"Unknown reconciliation method '{method}'. Use one of {RECONCILIATION_METHODS}.")
+
+
+def reconcile(S: np.ndarray, P: np.ndarray, base: np.ndarray, base_variance: np.ndarray = None):
+    """
+    Coherent forecasts of every node (n x horizon) from the base forecasts (k x horizon),
+    and, with per-horizon base variances (k x horizon), their propagated variances.
+    """
+    G = S @ P
+    reconciled = G @ base
+    if base_variance is None:
+        return reconciled, None
+    return reconciled, (G ** 2) @ base_variance
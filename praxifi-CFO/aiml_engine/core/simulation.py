@@ -22,8 +22,8 @@ class ScenarioSimulationEngine:
         if parameter not in df.columns:
             return {"error": f"Parameter '{parameter}' not found in the dataset."}
 
-        # Create a deep copy to avoid modifying the original data
-        sim_df = df.copy()
+        # Shallow copy: with copy-on-write, columns replaced below never touch the caller's frame
+        sim_df = df.copy(deep=False)
 
         # --- Calculate Baseline Metrics ---
         # Ensure 'profit' and 'cashflow' columns exist and are numeric
@@ -37,7 +37,7 @@ class ScenarioSimulationEngine:
         
         # --- Apply the Change ---
         multiplier = 1 + (change_pct / 100.0)
-        sim_df[parameter] *= multiplier
+        sim_df[parameter] = sim_df[parameter] * multiplier
         
         # --- Recalculate Dependent Metrics ---
         # The core of the simulation: how does the change propagate?
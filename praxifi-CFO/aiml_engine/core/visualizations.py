@@ -3,6 +3,8 @@ import numpy as np
 from typing import Dict, List, Any
 from scipy import stats
 
+from aiml_engine.utils.helpers import sort_by_date
+
 
 def make_json_serializable(obj):
     """Convert numpy/pandas types to native Python types for JSON serialization."""
@@ -55,7 +57,7 @@ class VisualizationDataGenerator:
         
         # Revenue by Region
         if 'region' in df.columns and 'revenue' in df.columns:
-            revenue_by_region = df.groupby('region')['revenue'].sum().reset_index()
+            revenue_by_region = df.groupby('region', observed=True)['revenue'].sum().reset_index()
             breakdowns['revenue_by_region'] = [
                 {"region": str(row['region']), "total_revenue": make_json_serializable(row['revenue'])}
                 for _, row in revenue_by_region.iterrows()
@@ -63,7 +65,7 @@ class VisualizationDataGenerator:
         
         # Profit by Region
         if 'region' in df.columns and 'profit' in df.columns:
-            profit_by_region = df.groupby('region')['profit'].sum().reset_index()
+            profit_by_region = df.groupby('region', observed=True)['profit'].sum().reset_index()
             breakdowns['profit_by_region'] = [
                 {"region": str(row['region']), "total_profit": make_json_serializable(row['profit'])}
                 for _, row in profit_by_region.iterrows()
@@ -71,7 +73,7 @@ class VisualizationDataGenerator:
         
         # Expenses by Department
         if 'department' in df.columns and 'expenses' in df.columns:
-            expenses_by_dept = df.groupby('department')['expenses'].sum().reset_index()
+            expenses_by_dept = df.groupby('department', observed=True)['expenses'].sum().reset_index()
             breakdowns['expenses_by_department'] = [
                 {"department": str(row['department']), "total_expenses": make_json_serializable(row['expenses'])}
                 for _, row in expenses_by_dept.iterrows()
@@ -79,7 +81,7 @@ class VisualizationDataGenerator:
         
         # Cashflow by Department
         if 'department' in df.columns and 'cashflow' in df.columns:
-            cashflow_by_dept = df.groupby('department')['cashflow'].sum().reset_index()
+            cashflow_by_dept = df.groupby('department', observed=True)['cashflow'].sum().reset_index()
             breakdowns['cashflow_by_department'] = [
                 {"department": str(row['department']), "total_cashflow": make_json_serializable(row['cashflow'])}
                 for _, row in cashflow_by_dept.iterrows()
@@ -87,7 +89,7 @@ class VisualizationDataGenerator:
         
         # Marketing Spend by Region
         if 'region' in df.columns and 'Marketing Spend' in df.columns:
-            marketing_by_region = df.groupby('region')['Marketing Spend'].sum().reset_index()
+            marketing_by_region = df.groupby('region', observed=True)['Marketing Spend'].sum().reset_index()
             breakdowns['marketing_spend_by_region'] = [
                 {"region": str(row['region']), "total_marketing_spend": make_json_serializable(row['Marketing Spend'])}
                 for _, row in marketing_by_region.iterrows()
@@ -96,14 +98,14 @@ class VisualizationDataGenerator:
         # AR/AP by Region
         if 'region' in df.columns:
             if 'ar' in df.columns:
-                ar_by_region = df.groupby('region')['ar'].mean().reset_index()
+                ar_by_region = df.groupby('region', observed=True)['ar'].mean().reset_index()
                 breakdowns['ar_by_region'] = [
                     {"region": str(row['region']), "avg_ar": make_json_serializable(row['ar'])}
                     for _, row in ar_by_region.iterrows()
                 ]
             
             if 'ap' in df.columns:
-                ap_by_region = df.groupby('region')['ap'].mean().reset_index()
+                ap_by_region = df.groupby('region', observed=True)['ap'].mean().reset_index()
                 breakdowns['ap_by_region'] = [
                     {"region": str(row['region']), "avg_ap": make_json_serializable(row['ap'])}
                     for _, row in ap_by_region.iterrows()
@@ -118,7 +120,8 @@ class VisualizationDataGenerator:
         if 'date' not in df.columns or not pd.api.types.is_datetime64_any_dtype(df['date']):
             return time_series
         
-        df_sorted = df.sort_values('date').copy()
+        # Shallow copy: rolling columns are added below without touching the caller's frame
+        df_sorted = sort_by_date(df).copy(deep=False)
         
         # Revenue vs Marketing Spend (Dual-axis)
         if 'revenue' in df_sorted.columns and 'Marketing Spend' in df_sorted.columns:
@@ -343,7 +346,7 @@ class TableGenerator:
             region_metrics = ['revenue', 'expenses', 'profit', 'cashflow']
             available_metrics = [m for m in region_metrics if m in df.columns]
             if available_metrics:
-                region_summary = df.groupby('region')[available_metrics].agg(['sum', 'mean', 'std'])
+                region_summary = df.groupby('region', observed=True)[available_metrics].agg(['sum', 'mean', 'std'])
                 # Flatten multi-level columns to avoid tuple keys
                 region_summary.columns = ['_'.join(col).strip() for col in region_summary.columns.values]
                 region_summary = region_summary.reset_index()
@@ -354,7 +357,7 @@ class TableGenerator:
             dept_metrics = ['revenue', 'expenses', 'profit', 'cashflow']
             available_metrics = [m for m in dept_metrics if m in df.columns]
             if available_metrics:
-                dept_summary = df.groupby('department')[available_metrics].agg(['sum', 'mean'])
+                dept_summary = df.groupby('department', observed=True)[available_metrics].agg(['sum', 'mean'])
                 # Flatten multi-level columns to avoid tuple keys
                 dept_summary.columns = ['_'.join(col).strip() for col in dept_summary.columns.values]
                 dept_summary = dept_summary.reset_index()
@@ -434,8 +437,8 @@ class TableGenerator:
         
         # Largest AP Drops
         if 'ap' in df.columns and 'date' in df.columns:
-            df_sorted = df.sort_values('date').copy()
-            df_sorted['ap_change'] = df_sorted['ap'].diff()
+            df_sorted = sort_by_date(df)
+            df_sorted = df_sorted.assign(ap_change=df_sorted['ap'].diff())
             largest_ap_drops = df_sorted.nsmallest(5, 'ap_change')[['date', 'ap', 'ap_change']]
             diagnostics['largest_ap_drops'] = [
                 {**{"date": row['date'].strftime('%Y-%m-%d') if pd.notna(row['date']) else None},
@@ -444,7 +447,7 @@ class TableGenerator:
             ]
         
         # High-risk Periods
-        high_risk = df.copy()
+        high_risk = df.copy(deep=False)
         risk_conditions = []
         
         if 'working_capital' in df.columns:
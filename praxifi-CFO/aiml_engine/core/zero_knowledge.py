@@ -23,6 +23,8 @@ from dataclasses import dataclass
 import numpy as np
 import pandas as pd
 
+from aiml_engine.utils.helpers import sort_by_date
+
 
 @dataclass
 class Commitment:
@@ -908,7 +910,7 @@ class DataValidator:
         if 'revenue' in df.columns:
             revenue_values = df['revenue'].dropna().values
             if len(revenue_values) > 0:
-                all_positive = all(v > 0 for v in revenue_values)
+                all_positive = bool((revenue_values > 0).all())
                 proof_hash, verified = self.prover.prove_statistical_property(
                     revenue_values, 'mean', 0
                 )
@@ -923,7 +925,7 @@ class DataValidator:
         if 'expenses' in df.columns:
             expense_values = df['expenses'].dropna().values
             if len(expense_values) > 0:
-                all_positive = all(v > 0 for v in expense_values)
+                all_positive = bool((expense_values > 0).all())
                 proof_hash, verified = self.prover.prove_statistical_property(
                     expense_values, 'mean', 0
                 )
@@ -955,7 +957,7 @@ class DataValidator:
         
         # 4. Prove revenue growth trend
         if 'revenue' in df.columns and 'date' in df.columns:
-            revenue_sorted = df.sort_values('date')['revenue'].dropna().values
+            revenue_sorted = sort_by_date(df)['revenue'].dropna().values
             if len(revenue_sorted) >= 3:
                 proof_hash, is_growing = self.prover.prove_growth_trend(revenue_sorted, is_growing=True)
                 validations['revenue_growth_trend'] = {
@@ -983,8 +985,8 @@ class DataValidator:
         if 'date' in df.columns:
             date_values = df['date'].dropna().values
             if len(date_values) > 0:
-                # Convert dates to timestamps for duplicate check
-                timestamps = np.array([pd.Timestamp(d).timestamp() for d in date_values])
+                # Convert dates to epoch seconds for duplicate check (vectorized)
+                timestamps = pd.DatetimeIndex(pd.to_datetime(date_values)).as_unit("ns").asi8 / 1e9
                 proof_hash, no_dupes = self.prover.prove_no_duplicates(timestamps)
                 validations['no_duplicate_dates'] = {
                     'proof_hash': proof_hash,
@@ -997,7 +999,7 @@ class DataValidator:
         if 'date' in df.columns:
             date_values = df['date'].dropna().values
             if len(date_values) > 1:
-                timestamps = np.array([pd.Timestamp(d).timestamp() for d in date_values])
+                timestamps = pd.DatetimeIndex(pd.to_datetime(date_values)).as_unit("ns").asi8 / 1e9
                 proof_hash, is_sorted = self.prover.prove_monotonic_sequence(timestamps, increasing=True)
                 validations['dates_chronological'] = {
                     'proof_hash': proof_hash,
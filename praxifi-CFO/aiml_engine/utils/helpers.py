@@ -1,4 +1,5 @@
 import json
+import os
 import numpy as np
 import pandas as pd
 from datetime import date, datetime
@@ -52,4 +53,65 @@ def convert_numpy_types(obj):
         import math
         if math.isnan(obj) or math.isinf(obj):
             return None
-    return obj
\ No newline at end of file
+    return obj
+
+
+def merge_sorted_frames(frames: list, key: str = 'date') -> pd.DataFrame:
+    """
+    Merges DataFrames that are each already sorted by `key` into one sorted frame.
+
+    NumPy's stable argsort is run-adaptive: on the concatenation of k sorted frames it
+    only merges the k existing runs (a k-way merge in C) instead of sorting from scratch.
+    The merge is stable, so rows with equal keys keep the order of `frames` and a later
+    `drop_duplicates(keep='last')` prefers rows from later frames.
+    """
+    merged = pd.concat(frames, ignore_index=True)
+    if key not in merged.columns or len(frames) < 2:
+        return merged
+
+    keys = merged[key]
+    if keys.isna().any():
+        return merged.sort_values(key, kind='stable').reset_index(drop=True)
+    order = np.argsort(keys.to_numpy(), kind='stable')
+    return merged.take(order).reset_index(drop=True)
+
+
+def drop_duplicate_periods(df: pd.DataFrame, segment_columns=('region', 'department'),
+                           key: str = 'date') -> pd.DataFrame:
+    """
+    Keeps the last row for each `key` within each segment, so a later file's rows replace an
+    earlier file's for the same period without collapsing regions/departments into one row.
+    Segment columns that are absent or entirely empty are ignored.
+    """
+    if key not in df.columns:
+        return df
+    by = [key] + [col for col in dict.fromkeys(segment_columns) if col in df.columns and df[col].notna().any()]
+    return df.drop_duplicates(subset=by, keep='last').reset_index(drop=True)
+
+
+def sort_by_date(df: pd.DataFrame, column: str = 'date') -> pd.DataFrame:
+    """
+    Returns `df` ordered by `column` (stable sort), or `df` itself when it is already
+    sorted - which the canonical frame handed between pipeline stages always is.
+    Callers that add columns to the result should take a shallow copy first.
+    """
+    if column not in df.columns or df[column].is_monotonic_increasing:
+        return df
+    return df.sort_values(column, kind='stable')
+
+
+def safe_ratio(numerator, denominator) -> np.ndarray:
+    """numerator / denominator where the denominator is positive, else 0 (ratio KPIs and their forecasts)."""
+    return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), 0)
+
+
+def enable_copy_on_write() -> bool:
+    """
+    Turns on pandas copy-on-write for this process unless PANDAS_COPY_ON_WRITE=false:
+    stages hand one canonical frame along and add columns to it, and pandas copies a
+    column only when it is actually modified, never the whole frame up front.
+    Called at API startup and in forecasting workers; returns whether it is on.
+    """
+    if os.getenv("PANDAS_COPY_ON_WRITE", "true").lower() == "true":
+        pd.options.mode.copy_on_write = True
+    return bool(pd.options.mode.copy_on_write)
@@ -0,0 +1,43 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from starlette.datastructures import UploadFile
+
+pytest.importorskip("google.generativeai")
+# The agent configures its client at import; file processing never calls the model
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+try:
+    from aiml_engine.api.endpoints import process_uploaded_files
+except Exception as e:  # The endpoints module connects to Redis at import
+    pytest.skip(f"API endpoints unavailable: {e}", allow_module_level=True)
+
+
+def _upload(df: pd.DataFrame, filename: str) -> UploadFile:
+    return UploadFile(file=io.BytesIO(df.to_csv(index=False).encode('utf-8')), filename=filename)
+
+
+def test_merged_uploads_keep_every_region_and_department():
+    """Merging uploads deduplicates periods per segment, so multi-segment rows reach the forecasters."""
+    rng = np.random.default_rng(5)
+    dates = pd.date_range('2022-01-01', periods=36, freq='MS')
+    rows = [
+        {'Date': date, 'Region': region, 'Department': department, 'Revenue': rng.uniform(800, 1200),
+         'Expenses': rng.uniform(400, 600)}
+        for date in dates for region in ('East', 'West') for department in ('Ops', 'Sales')
+    ]
+    history = pd.DataFrame(rows)
+    # The second upload restates the last month for every segment
+    restated = history[history['Date'] == dates[-1]].assign(Revenue=5000.0)
+
+    results = process_uploaded_files([_upload(history, 'history.csv'), _upload(restated, 'restated.csv')])
+    merged_df = results["featured_df"]
+
+    assert len(merged_df) == len(history)
+    assert merged_df.groupby(['region', 'department']).size().to_dict() == {
+        ('East', 'Ops'): 36, ('East', 'Sales'): 36, ('West', 'Ops'): 36, ('West', 'Sales'): 36
+    }
+    assert (merged_df.loc[merged_df['date'] == dates[-1], 'revenue'] == 5000.0).all()
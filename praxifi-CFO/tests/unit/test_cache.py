@@ -0,0 +1,21 @@
+from aiml_engine.core.cache import DiskCacheBackend, PersistentLRUCache, entry_size
+
+
+def test_size_bounded_cache_evicts_least_recently_used(tmp_path):
+    """Entries are evicted by total serialized size, in LRU order, in memory and on disk."""
+    value = {"forecast": [{"predicted": 1.0}] * 20}
+    size = entry_size(value)
+    backend = DiskCacheBackend(str(tmp_path), "forecasts", max_bytes=2 * size)
+    cache = PersistentLRUCache(max_entries=100, backend=backend, namespace="forecasts", max_bytes=2 * size)
+
+    cache.set("a", value)
+    cache.set("b", value)
+    assert cache.get("a") == value  # "b" becomes least recently used
+    cache.set("c", value)
+
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.stats()["bytes"] == 2 * size
+    assert len(list(tmp_path.joinpath("forecasts").glob("*.json"))) == 2
+
+    cache.set("huge", {"forecast": [{"predicted": 1.0}] * 200})
+    assert list(cache._entries) == ["a", "c"]
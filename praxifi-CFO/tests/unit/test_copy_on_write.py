@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aiml_engine.core.data_validation import DataValidationQualityAssuranceEngine
+from aiml_engine.core.feature_engineering import KPIAutoExtractionDynamicFeatureEngineering
+from aiml_engine.core.simulation import ScenarioSimulationEngine
+from aiml_engine.core.visualizations import VisualizationDataGenerator, TableGenerator
+from aiml_engine.core.zero_knowledge import create_data_certificate
+from aiml_engine.utils.helpers import enable_copy_on_write
+
+
+@pytest.fixture(autouse=True)
+def copy_on_write(monkeypatch):
+    """Copy-on-write as the API enables it at startup, restored afterwards."""
+    monkeypatch.setenv("PANDAS_COPY_ON_WRITE", "true")
+    with pd.option_context("mode.copy_on_write", pd.options.mode.copy_on_write):
+        assert enable_copy_on_write()
+        yield
+
+
+@pytest.fixture
+def normalized_df():
+    rng = np.random.default_rng(3)
+    n = 24
+    revenue = rng.uniform(80_000, 120_000, n)
+    expenses = rng.uniform(50_000, 70_000, n)
+    revenue[4] = np.nan
+    return pd.DataFrame({
+        'date': pd.date_range('2023-01-01', periods=n, freq='MS'),
+        'revenue': revenue,
+        'expenses': expenses,
+        'profit': revenue - expenses,
+        'cashflow': rng.uniform(10_000, 30_000, n),
+        'assets': rng.uniform(400_000, 500_000, n),
+        'liabilities': rng.uniform(150_000, 250_000, n),
+        'ar': rng.uniform(20_000, 40_000, n),
+        'ap': rng.uniform(10_000, 20_000, n),
+        'region': rng.choice(['North', 'South'], n),
+    })
+
+
+@pytest.fixture
+def copy_counter(monkeypatch):
+    """Counts full-frame deep copies (small slices such as head() are ignored) and sorts."""
+    counts = {"deep_copies": 0, "sorts": 0, "min_rows": 24}
+    original_copy, original_sort = pd.DataFrame.copy, pd.DataFrame.sort_values
+
+    def counting_copy(self, deep=True):
+        if deep and len(self) >= counts["min_rows"]:
+            counts["deep_copies"] += 1
+        return original_copy(self, deep=deep)
+
+    def counting_sort(self, *args, **kwargs):
+        counts["sorts"] += 1
+        return original_sort(self, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, "copy", counting_copy)
+    monkeypatch.setattr(pd.DataFrame, "sort_values", counting_sort)
+    return counts
+
+
+def test_pipeline_hands_one_frame_between_stages_without_copies(normalized_df, copy_counter):
+    """Validation, features, simulation, charts and ZK run on one canonical frame: no deep copies, no re-sorts."""
+    assert pd.options.mode.copy_on_write
+    snapshot = normalized_df.copy()
+    copy_counter["deep_copies"] = 0
+
+    validated_df, _, _ = DataValidationQualityAssuranceEngine().run_pipeline(normalized_df, {})
+    featured_df, _ = KPIAutoExtractionDynamicFeatureEngineering().extract_and_derive_features(validated_df)
+    ScenarioSimulationEngine().simulate_scenario(featured_df, 'revenue', 10.0)
+    VisualizationDataGenerator().generate_all_charts(featured_df)
+    TableGenerator().generate_all_tables(featured_df)
+    create_data_certificate(featured_df)
+
+    assert copy_counter["deep_copies"] == 0
+    assert copy_counter["sorts"] == 0
+    # Inputs are never modified in place
+    pd.testing.assert_frame_equal(normalized_df, snapshot)
+    assert 'profit_margin' not in validated_df.columns
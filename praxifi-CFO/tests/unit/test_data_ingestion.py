@@ -1,6 +1,12 @@
+import io
+import numpy as np
 import pandas as pd
+import pytest
 import os
-from aiml_engine.core.data_ingestion import DataIngestion
+from aiml_engine.core import data_ingestion
+from aiml_engine.core.data_ingestion import (
+    DataIngestion, SynonymEmbeddingIndex, get_header_mapping_cache, get_synonym_index
+)
 
 # Create a dummy CSV for testing
 DUMMY_CSV_CONTENT = "Date,Sales,Costs\n2024-01-01,1000,600\n2024-02-01,1100,650"
@@ -32,4 +38,191 @@ def test_date_parsing():
     ingestion = DataIngestion()
     normalized_df, _ = ingestion.ingest_and_normalize(DUMMY_CSV_PATH)
     
-    assert pd.api.types.is_datetime64_any_dtype(normalized_df['date'])
\ No newline at end of file
+    assert pd.api.types.is_datetime64_any_dtype(normalized_df['date'])
+
+def test_lexical_tiers_resolve_without_nlp_model():
+    """Verbatim, normalized and near-miss headers are mapped without loading spaCy."""
+    ingestion = DataIngestion(use_nlp=False)
+    matches = ingestion._match_headers(["Revenue", "Net_Income", "Expense", "Internal Notes", "Widget Count"])
+
+    assert [m[0] for m in matches] == ['revenue', 'profit', 'expenses', None, None]
+    assert ingestion.last_match_tiers == {'Revenue': 'exact', 'Net_Income': 'exact', 'Expense': 'fuzzy'}
+    assert ingestion._nlp is None
+
+
+def test_nlp_model_is_loaded_once_and_shared(monkeypatch):
+    """Every DataIngestion instance uses the process-wide spaCy model from get_nlp_model."""
+    spacy = pytest.importorskip("spacy")
+    loads = []
+    monkeypatch.setattr(data_ingestion, "_global_nlp", None)
+    monkeypatch.setattr(spacy, "load", lambda name: loads.append(name) or spacy.blank("en"))
+
+    first, second = DataIngestion(), DataIngestion()
+
+    assert first.nlp is second.nlp
+    assert first.nlp is data_ingestion.get_nlp_model()
+    assert loads == ["en_core_web_sm"]
+
+
+def test_synonym_header_resolves_through_embedding_tier():
+    """A header no lexical tier knows is matched by cosine similarity against the synonym matrix."""
+    spacy = pytest.importorskip("spacy")
+    nlp = spacy.blank("en")
+    vectors = {"sales": [1.0, 0.0, 0.0], "turnover": [1.0, 0.0, 0.0], "takings": [0.95, 0.1, 0.0],
+               "costs": [0.0, 1.0, 0.0], "notes": [0.0, 0.0, 1.0]}
+    for word, vector in vectors.items():
+        nlp.vocab.set_vector(word, np.asarray(vector, dtype=np.float32))
+    ingestion = DataIngestion(nlp=nlp)
+
+    matches = ingestion._match_headers(["Takings", "Notes"])
+
+    assert matches[0][0] == 'revenue' and matches[0][1] > 0.75
+    assert matches[1] == (None, 0.0)
+    assert ingestion.last_match_tiers == {'Takings': 'nlp'}
+    index = get_synonym_index(nlp, ingestion.unified_schema)
+    assert isinstance(index, SynonymEmbeddingIndex)
+    assert index is get_synonym_index(nlp, ingestion.unified_schema)
+
+
+def test_header_mappings_are_cached_by_schema_fingerprint():
+    """A repeated header layout is one cache hit; editing the blocklist invalidates it."""
+    cache = get_header_mapping_cache()
+    cache.invalidate()
+    ingestion = DataIngestion(use_nlp=False)
+
+    misses_before = cache.misses
+    ingestion.ingest_and_normalize(DUMMY_CSV_PATH)
+    hits_before = cache.hits
+    _, header_mappings = ingestion.ingest_and_normalize(DUMMY_CSV_PATH)
+
+    assert cache.misses == misses_before + 1
+    assert cache.hits == hits_before + 1
+    assert header_mappings == {'Date': 'date', 'Sales': 'revenue', 'Costs': 'expenses'}
+
+    ingestion.blocklist.append('costs')
+    _, header_mappings = ingestion.ingest_and_normalize(DUMMY_CSV_PATH)
+    assert cache.misses == misses_before + 2
+    assert 'Costs' not in header_mappings
+
+
+def test_ingest_from_in_memory_buffer():
+    """Uploads can be parsed straight from a bytearray without touching disk."""
+    buffer = bytearray(DUMMY_CSV_CONTENT.encode('utf-8'))
+    normalized_df, header_mappings = DataIngestion(use_nlp=False).ingest_and_normalize(buffer)
+
+    assert header_mappings['Sales'] == 'revenue'
+    assert normalized_df['revenue'].tolist() == [1000, 1100]
+    assert pd.api.types.is_datetime64_any_dtype(normalized_df['date'])
+
+
+def test_arrow_engine_and_parquet_input_match_pandas_reader():
+    """The pyarrow CSV reader and Parquet uploads normalize to the same data as the pandas reader."""
+    pytest.importorskip("pyarrow")
+    buffer = bytearray(DUMMY_CSV_CONTENT.encode('utf-8'))
+    pandas_df, _ = DataIngestion(use_nlp=False, engine='pandas').ingest_and_normalize(buffer)
+    arrow_df, _ = DataIngestion(use_nlp=False, engine='pyarrow').ingest_and_normalize(buffer)
+
+    parquet_buffer = io.BytesIO()
+    pd.read_csv(io.StringIO(DUMMY_CSV_CONTENT)).to_parquet(parquet_buffer)
+    parquet_df, header_mappings = DataIngestion(use_nlp=False).ingest_and_normalize(
+        bytearray(parquet_buffer.getvalue()), filename='export.parquet'
+    )
+
+    for df in (arrow_df, parquet_df):
+        assert df['revenue'].tolist() == pandas_df['revenue'].tolist()
+        assert df['expenses'].tolist() == pandas_df['expenses'].tolist()
+        assert df['date'].tolist() == pandas_df['date'].tolist()
+    assert header_mappings['Costs'] == 'expenses'
+
+
+def test_feather_frame_survives_wiping_the_upload_buffer():
+    """Uncompressed Feather columns are not left pointing into the (wiped) upload buffer."""
+    pytest.importorskip("pyarrow")
+    from aiml_engine.core.secure_memory import secure_wipe
+
+    feather_buffer = io.BytesIO()
+    pd.read_csv(io.StringIO(DUMMY_CSV_CONTENT), parse_dates=['Date']).to_feather(feather_buffer, compression='uncompressed')
+    buffer = bytearray(feather_buffer.getvalue())
+    normalized_df, _ = DataIngestion(use_nlp=False).ingest_and_normalize(buffer, filename='export.feather')
+    expected_df = normalized_df.copy(deep=True)
+
+    secure_wipe(buffer)
+
+    assert not any(buffer)
+    pd.testing.assert_frame_equal(normalized_df, expected_df)
+
+
+def test_ingested_frames_do_not_share_memory_with_the_upload():
+    """Every reader's frame is unaffected by wiping the upload buffer, as process_uploaded_file does."""
+    pytest.importorskip("pyarrow")
+    from aiml_engine.core.secure_memory import secure_wipe
+
+    source_df = pd.read_csv(io.StringIO(DUMMY_CSV_CONTENT), parse_dates=['Date'])
+    parquet_buffer, feather_buffer = io.BytesIO(), io.BytesIO()
+    source_df.to_parquet(parquet_buffer, compression=None)
+    source_df.to_feather(feather_buffer, compression='uncompressed')
+    uploads = [
+        ('pandas', 'export.csv', DUMMY_CSV_CONTENT.encode('utf-8')),
+        ('pyarrow', 'export.csv', DUMMY_CSV_CONTENT.encode('utf-8')),
+        ('pandas', 'export.parquet', parquet_buffer.getvalue()),
+        ('pandas', 'export.feather', feather_buffer.getvalue()),
+    ]
+    for engine, filename, payload in uploads:
+        buffer = bytearray(payload)
+        normalized_df, _ = DataIngestion(use_nlp=False, engine=engine).ingest_and_normalize(buffer, filename=filename)
+        expected_df = normalized_df.copy(deep=True)
+        secure_wipe(buffer)
+        pd.testing.assert_frame_equal(normalized_df, expected_df, obj=f"{engine} {filename}")
+
+
+def test_numeric_cleaning_handles_currency_parentheses_and_percent():
+    """Messy numeric text is parsed in one pass and unparseable values are counted."""
+    csv = 'Date,Revenue,Expenses\n2024-01-01,"$1,200.50",(300)\n2024-02-01,TBD,12.5%\n2024-03-01,,"1,000"'
+    ingestion = DataIngestion(use_nlp=False)
+    normalized_df, _ = ingestion.ingest_and_normalize(bytearray(csv.encode('utf-8')))
+
+    assert normalized_df['revenue'].iloc[0] == 1200.5
+    assert normalized_df['revenue'].iloc[1:].isna().all()
+    assert normalized_df['expenses'].tolist() == [-300, 12.5, 1000]
+    assert ingestion.numeric_parse_failures['revenue'] == 1
+    assert ingestion.numeric_parse_failures['expenses'] == 0
+
+
+def test_date_format_is_inferred_once_and_cached_per_layout():
+    """Day-first dates are detected from a sample; the layout's cached format is reused."""
+    cache = get_header_mapping_cache()
+    cache.invalidate()
+    csv = "Period,Revenue\n03/01/2024,100\n25/01/2024,200\n14/02/2024,300\n"
+
+    ingestion = DataIngestion(use_nlp=False)
+    normalized_df, _ = ingestion.ingest_and_normalize(bytearray(csv.encode('utf-8')))
+
+    assert ingestion.date_format == '%d/%m/%Y'
+    assert normalized_df['date'].tolist() == list(pd.to_datetime(['2024-01-03', '2024-01-25', '2024-02-14']))
+
+    key = ingestion.schema_fingerprint(['Period', 'Revenue'])
+    assert cache.get(key)['date_format'] == '%d/%m/%Y'
+
+    second = DataIngestion(use_nlp=False)
+    second_df, _ = second.ingest_and_normalize(bytearray(csv.encode('utf-8')))
+    assert second.date_format == '%d/%m/%Y'
+    assert second_df['date'].equals(normalized_df['date'])
+
+
+def test_missing_nlp_model_leaves_lexical_tiers_serving(monkeypatch):
+    """Startup and uploads survive a spaCy model that cannot be loaded; the layout is not cached."""
+    def unavailable(*args, **kwargs):
+        raise OSError("spaCy model 'en_core_web_sm' is not installed and could not be downloaded")
+
+    monkeypatch.setattr(data_ingestion, "get_nlp_model", unavailable)
+    data_ingestion.warm_up_header_matcher()
+
+    cache = get_header_mapping_cache()
+    cache.invalidate()
+    csv = "Date,Sales,Takings\n2024-01-01,1000,600\n2024-02-01,1100,650"
+    ingestion = DataIngestion(use_nlp=True)
+    _, header_mappings = ingestion.ingest_and_normalize(bytearray(csv.encode('utf-8')))
+
+    assert header_mappings == {'Date': 'date', 'Sales': 'revenue'}
+    assert ingestion.nlp_tier_failed is True
+    assert cache.get(ingestion.schema_fingerprint(['Date', 'Sales', 'Takings'])) is None
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from aiml_engine.core.data_validation import DataValidationQualityAssuranceEngine, RangeRule, RuleEngine
+
+
+def test_corrections_log_is_columnar_with_lazy_records():
+    """Imputations are stored as row-index arrays; the summary comes from their lengths."""
+    df = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=5, freq='MS'),
+        'revenue': [100.0, np.nan, 300.0, np.nan, 500.0],
+        'expenses': [50.0, 60.0, np.nan, 80.0, 90.0],
+    })
+    engine = DataValidationQualityAssuranceEngine()
+    cleaned_df, report, corrections_log = engine.run_pipeline(df, {})
+
+    assert report['imputed_columns_summary'] == {'revenue': 2, 'expenses': 1}
+    assert report['missing_values_imputed'] is True
+    assert len(corrections_log) == 3
+    assert cleaned_df['revenue'].tolist() == [100.0, 300.0, 300.0, 300.0, 500.0]
+
+    columnar = corrections_log.to_columnar()
+    assert columnar['columns']['revenue'] == {'row_ids': [1, 3], 'correction': 300.0, 'method': 'median_impute'}
+
+    records = corrections_log.to_records()
+    assert [(r['row_id'], r['column']) for r in records] == [(1, 'revenue'), (3, 'revenue'), (2, 'expenses')]
+    assert {r['timestamp'] for r in records} == {columnar['timestamp']}
+
+
+def test_rule_engine_flags_rows_in_one_pass():
+    """Sign, balance identity, date gap, duplicate and outlier rules produce a per-row flag matrix."""
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01', '2024-03-01', '2024-06-01', '2024-07-01']),
+        'revenue': [100.0, 110.0, -5.0, 120.0, 130.0, 125.0],
+        'expenses': [60.0, 70.0, 40.0, 80.0, 90.0, 85.0],
+        'profit': [40.0, 40.0, -45.0, 40.0, 90.0, 40.0],
+    })
+    engine = DataValidationQualityAssuranceEngine()
+    _, report, _ = engine.run_pipeline(df, {})
+    flags = engine.rule_flags
+    rules = report['rule_violations']['rules']
+
+    assert flags.shape[0] == len(df)
+    assert flags.index[flags['revenue_non_negative']].tolist() == [2]
+    assert flags.index[flags['profit_identity']].tolist() == [4]
+    assert flags.index[flags['duplicate_dates']].tolist() == [2, 3]
+    assert flags.index[flags['date_gaps']].tolist() == [4]
+    assert rules['profit_identity']['violations'] == 1
+    assert 'assets_non_negative' in report['rule_violations']['rules_skipped']
+    assert report['rule_violations']['rows_flagged'] == int(flags.any(axis=1).sum())
+
+
+def test_rule_engine_accepts_custom_rules():
+    """Rules are declarative; a custom range rule is evaluated like the built-ins."""
+    df = pd.DataFrame({'dso': [30.0, 45.0, 400.0, np.nan]})
+    flags, summary = RuleEngine([RangeRule('dso_range', 'dso', 0, 365)]).evaluate(df)
+
+    assert flags['dso_range'].tolist() == [False, False, True, False]
+    assert summary['rules']['dso_range']['example_rows'] == [2]
+
+
+def test_range_rule_skips_columns_whose_dtype_does_not_match_its_bounds():
+    """Dates still held as strings are not compared with the Timestamp bounds of date_in_range."""
+    df = pd.DataFrame({
+        'date': ['2024-01-01', '2024-02-01', 'not a date'],
+        'revenue': [100.0, 110.0, 120.0],
+    })
+    engine = DataValidationQualityAssuranceEngine()
+    _, report, _ = engine.run_pipeline(df, {})
+
+    assert 'date_in_range' in report['rule_violations']['rules_skipped']
+    assert RangeRule('dso_range', 'date', 0, 365).mask(df) is None
+
+    dated = df.iloc[:2].assign(date=pd.to_datetime(['1850-01-01', '2024-02-01']))
+    _, report, _ = engine.run_pipeline(dated, {})
+    assert report['rule_violations']['rules']['date_in_range']['example_rows'] == [0]
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aiml_engine.core.feature_engineering import KPIAutoExtractionDynamicFeatureEngineering
+
+
+@pytest.fixture
+def sample_data():
+    """Three years of monthly data across regions and departments."""
+    rng = np.random.default_rng(7)
+    n = 36
+    return pd.DataFrame({
+        'date': pd.date_range('2021-01-01', periods=n, freq='MS'),
+        'revenue': rng.uniform(80_000, 120_000, n),
+        'expenses': rng.uniform(50_000, 70_000, n),
+        'assets': rng.uniform(400_000, 500_000, n),
+        'liabilities': rng.uniform(150_000, 250_000, n),
+        'cashflow': rng.uniform(10_000, 30_000, n),
+        'ar': rng.uniform(20_000, 40_000, n),
+        'ap': rng.uniform(10_000, 20_000, n),
+        'region': rng.choice(['North', 'South'], n),
+        'department': rng.choice(['Sales', 'Ops', 'R&D'], n),
+    })
+
+
+def test_compact_mode_shrinks_frame_without_changing_values(sample_data):
+    """Compact dtypes save memory and keep KPI values within float32 precision."""
+    full_df, full_schema = KPIAutoExtractionDynamicFeatureEngineering(compact=False).extract_and_derive_features(sample_data)
+    module = KPIAutoExtractionDynamicFeatureEngineering(compact=True)
+    compact_df, compact_schema = module.extract_and_derive_features(sample_data)
+
+    assert module.memory_report['bytes_saved'] > 0
+    assert module.memory_report['bytes_after'] == compact_df.memory_usage(deep=True).sum()
+    assert compact_df['region'].dtype == 'category'
+    assert compact_df['month'].dtype == np.int8
+    assert compact_df['profit_margin'].dtype == np.float32
+    assert compact_df['revenue'].dtype == np.float64
+
+    assert [entry['feature'] for entry in compact_schema] == [entry['feature'] for entry in full_schema]
+    np.testing.assert_allclose(compact_df['profit_margin'], full_df['profit_margin'], rtol=1e-6)
+    assert compact_df.groupby('region', observed=True)['revenue'].sum().equals(full_df.groupby('region')['revenue'].sum())
+
+
+def test_targets_evaluate_only_the_needed_subgraph(sample_data):
+    """Requesting a KPI computes it and its dependencies only, with the same values and schema entries."""
+    full_module = KPIAutoExtractionDynamicFeatureEngineering(compact=False)
+    full_df, full_schema = full_module.extract_and_derive_features(sample_data)
+    module = KPIAutoExtractionDynamicFeatureEngineering(compact=False)
+    partial_df, partial_schema = module.extract_and_derive_features(sample_data, targets=['cash_conversion_cycle', 'profit_margin'])
+
+    assert set(module.kpi_timings) == {'profit', 'profit_margin', 'dso', 'dpo', 'cash_conversion_cycle'}
+    assert set(full_module.kpi_timings) >= set(module.kpi_timings)
+    assert 'revenue_cagr' not in partial_df.columns
+    for column in module.kpi_timings:
+        pd.testing.assert_series_equal(partial_df[column], full_df[column])
+    assert partial_schema == [entry for entry in full_schema if entry['feature'] in module.kpi_timings]
+
+    with pytest.raises(ValueError):
+        module.extract_and_derive_features(sample_data, targets=['not_a_kpi'])
+
+
+@pytest.mark.parametrize('seed', range(12))
+def test_update_features_matches_full_recompute(seed):
+    """Appending rows incrementally yields exactly the frame and schema of a full recompute."""
+    rng = np.random.default_rng(seed)
+    n, k = int(rng.integers(3, 40)), int(rng.integers(1, 14))
+    columns = list(rng.choice(['revenue', 'expenses', 'assets', 'liabilities', 'cashflow', 'ar', 'ap', 'Marketing Spend'],
+                              size=int(rng.integers(2, 9)), replace=False))
+    df = pd.DataFrame({
+        'date': pd.date_range('2020-03-01', periods=n + k, freq=rng.choice(['MS', 'W', 'QS'])),
+        **{column: rng.integers(-50, 1_000, n + k).astype(float) for column in columns},
+    })
+    previous, new_rows = df.iloc[:n], df.iloc[n:].reset_index(drop=True)
+    if seed % 2:
+        new_rows.loc[int(rng.integers(0, k)), columns[0]] = np.nan
+
+    module = KPIAutoExtractionDynamicFeatureEngineering(compact=False)
+    featured_df, _ = module.extract_and_derive_features(previous)
+    updated_df, updated_schema = module.update_features(featured_df, new_rows)
+    expected_df, expected_schema = KPIAutoExtractionDynamicFeatureEngineering(compact=False).extract_and_derive_features(
+        pd.concat([previous, new_rows], ignore_index=True))
+
+    pd.testing.assert_frame_equal(updated_df, expected_df, check_exact=True)
+    assert updated_schema == expected_schema
+
+
+def test_update_features_falls_back_for_back_dated_rows(sample_data):
+    module = KPIAutoExtractionDynamicFeatureEngineering(compact=False)
+    featured_df, _ = module.extract_and_derive_features(sample_data.iloc[6:])
+    updated_df, _ = module.update_features(featured_df, sample_data.iloc[:6])
+
+    assert module.update_report['mode'] == 'full'
+    expected_df, _ = KPIAutoExtractionDynamicFeatureEngineering(compact=False).extract_and_derive_features(sample_data)
+    pd.testing.assert_frame_equal(updated_df, expected_df)
+
+
+def test_segmented_mode_matches_per_segment_computation(sample_data):
+    """Window KPIs in segmented mode equal those computed on each region's rows alone."""
+    module = KPIAutoExtractionDynamicFeatureEngineering(compact=False, segment_by=['region'])
+    featured_df, _ = module.extract_and_derive_features(sample_data)
+    window_kpis = ['revenue_mom_growth', 'revenue_yoy_growth', 'working_capital_change', 'revenue_cagr']
+
+    assert set(module.segment_frames) == {'region'}
+    assert sum(len(frame) for frame in module.segment_frames['region'].values()) == len(featured_df)
+    for region, segment_df in module.segment_frames['region'].items():
+        expected_df, _ = KPIAutoExtractionDynamicFeatureEngineering(compact=False, segment_by=[]).extract_and_derive_features(
+            sample_data[sample_data['region'] == region])
+        assert (segment_df['region'] == region).all()
+        for column in window_kpis:
+            np.testing.assert_allclose(segment_df[column].to_numpy(), expected_df[column].to_numpy(), rtol=1e-12)
+
+
+def test_segment_frames_cover_each_column_and_their_combination(sample_data):
+    """With two segment columns, KPIs group by the pair; frames exist per column and per pair."""
+    module = KPIAutoExtractionDynamicFeatureEngineering(compact=False, segment_by=['region', 'department'])
+    featured_df, _ = module.extract_and_derive_features(sample_data)
+
+    assert set(module.segment_frames) == {'region', 'department', ('region', 'department')}
+    assert set(module.segment_frames['region']) == {'North', 'South'}
+    for (region, department), cell_df in module.segment_frames[('region', 'department')].items():
+        expected_df, _ = KPIAutoExtractionDynamicFeatureEngineering(compact=False, segment_by=[]).extract_and_derive_features(
+            sample_data[(sample_data['region'] == region) & (sample_data['department'] == department)])
+        assert (cell_df['region'] == region).all() and (cell_df['department'] == department).all()
+        np.testing.assert_allclose(cell_df['revenue_mom_growth'].to_numpy(),
+                                   expected_df['revenue_mom_growth'].to_numpy(), rtol=1e-12)
+    assert sum(len(frame) for frame in module.segment_frames[('region', 'department')].values()) == len(featured_df)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from aiml_engine.core.forecast_pool import (
+    forecast_segment, get_forecast_pool, screen_segment, shutdown_forecast_pool, start_forecast_pool
+)
+from aiml_engine.core.frame_handoff import published_frame
+
+
+def test_pool_is_shared_and_restarts_after_shutdown():
+    """Every caller gets the same pool until shutdown; workers stay warm between jobs."""
+    pool = start_forecast_pool(max_workers=1)
+    try:
+        assert get_forecast_pool() is pool
+        df = pd.DataFrame({
+            'date': pd.date_range('2022-01-01', periods=12, freq='MS'),
+            'region': ['North', 'South'] * 6,
+            'revenue': np.arange(12, dtype=float),
+        })
+        with published_frame(df[df['region'] == 'North']) as north, published_frame(df[df['region'] == 'South']) as south:
+            first = pool.submit(forecast_segment, 'North', north).result()
+            second = get_forecast_pool().submit(forecast_segment, 'South', south).result()
+        # Too little history to forecast: nothing is returned
+        assert first == ('North', [], False) and second == ('South', [], False)
+    finally:
+        shutdown_forecast_pool()
+    restarted = get_forecast_pool()
+    try:
+        assert restarted is not pool
+    finally:
+        shutdown_forecast_pool()
+
+
+def test_screen_segment_skips_short_and_noisy_segments():
+    """Only segments with enough history and a forecastable series are dispatched."""
+    rng = np.random.default_rng(7)
+    t = np.arange(36)
+    dates = pd.date_range('2021-01-01', periods=36, freq='MS')
+    smooth = pd.DataFrame({'date': dates, 'revenue': 1000 + 15 * t + 80 * np.sin(2 * np.pi * t / 12)})
+    noisy = pd.DataFrame({'date': dates, 'revenue': 1000 * (1 + 0.5 * rng.standard_normal(36))})
+
+    assert screen_segment(smooth) is None
+    assert screen_segment(smooth.head(20)).startswith('Not enough data')
+    assert screen_segment(noisy).startswith('Unforecastable series')
@@ -0,0 +1,29 @@
+import time
+
+from aiml_engine.core.forecast_pool import shutdown_forecast_pool, start_forecast_pool
+from aiml_engine.core.forecast_scheduler import (
+    PRIORITY_CORE, PRIORITY_SECONDARY, PRIORITY_SEGMENT, ForecastJob, ForecastScheduler
+)
+
+
+def _sleep_and_return(key, seconds):
+    time.sleep(seconds)
+    return key
+
+
+def test_scheduler_runs_by_priority_and_defers_at_deadline():
+    """Higher-priority jobs start first; jobs unfinished at the deadline are deferred."""
+    pool = start_forecast_pool(max_workers=1)
+    try:
+        pool.submit(_sleep_and_return, 'warm', 0).result()
+        jobs = [
+            ForecastJob(('region', 'North'), _sleep_and_return, ('North', 6), PRIORITY_SEGMENT),
+            ForecastJob('dso', _sleep_and_return, ('dso', 0), PRIORITY_SECONDARY),
+            ForecastJob('revenue', _sleep_and_return, ('revenue', 0), PRIORITY_CORE),
+        ]
+        schedule = ForecastScheduler(budget_seconds=2).run(jobs)
+        assert list(schedule.results) == ['revenue', 'dso']
+        assert schedule.deferred == [('region', 'North')]
+        assert schedule.elapsed_seconds < 5
+    finally:
+        shutdown_forecast_pool(wait=False)
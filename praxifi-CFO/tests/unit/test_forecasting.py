@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import pytest
 from aiml_engine.core.forecasting import ForecastingModule
@@ -34,4 +35,208 @@ def test_forecasting_with_insufficient_data():
     
     assert forecast == []
     assert model_health['status'] == 'Failed'
-    assert 'Not enough data' in model_health['reason']
\ No newline at end of file
+    assert 'Not enough data' in model_health['reason']
+
+def test_repeat_forecast_is_served_from_cache(sample_time_series_df, monkeypatch):
+    """An identical series is answered from the cache; unrelated columns do not change the key."""
+    from aiml_engine.core import forecasting
+    from aiml_engine.core.cache import PersistentLRUCache
+
+    monkeypatch.setattr(forecasting, "_global_forecast_cache", PersistentLRUCache(namespace="forecasts", max_bytes=1 << 20))
+    fits = []
+    original_fit = ForecastingModule._fit_and_forecast
+    monkeypatch.setattr(ForecastingModule, "_fit_and_forecast", lambda self, data: fits.append(1) or original_fit(self, data))
+
+    forecaster = ForecastingModule(metric='revenue', forecast_horizon=3, use_cache=True)
+    forecast, model_health = forecaster.generate_forecast(sample_time_series_df)
+    repeat_df = sample_time_series_df.assign(region='North')
+    cached_forecast, cached_health = forecaster.generate_forecast(repeat_df)
+
+    assert len(fits) == 1
+    assert cached_forecast == forecast
+    assert cached_health['cache_hit'] is True
+    assert 'cache_hit' not in model_health
+
+    ForecastingModule(metric='revenue', forecast_horizon=6, use_cache=True).generate_forecast(repeat_df)
+    assert len(fits) == 2
+
+def test_reuse_strategy_fits_prophet_once(monkeypatch):
+    """'reuse' forecasts with a backtest model that fit the holdout: one Stan fit, dates follow the data."""
+    t = np.arange(36)
+    smooth_df = pd.DataFrame({
+        'date': pd.date_range(start="2022-01-01", periods=36, freq='MS'),
+        'revenue': 1000 + 10 * t + 50 * np.sin(2 * np.pi * t / 12),
+    })
+    fits = []
+    original_train = ForecastingModule._train_prophet
+    monkeypatch.setattr(ForecastingModule, "_train_prophet",
+                        lambda self, train_df, init=None: fits.append(len(train_df)) or original_train(self, train_df, init))
+
+    forecaster = ForecastingModule(metric='revenue', forecast_horizon=3, use_cache=False, refit_strategy='reuse',
+                                    tiered=False)
+    forecast, model_health = forecaster.generate_forecast(smooth_df)
+
+    assert fits == [30]
+    assert [point['date'] for point in forecast] == ['2025-01-01', '2025-02-01', '2025-03-01']
+    assert model_health['refit_strategy'] == 'reuse'
+    assert model_health['trained_through'] == '2024-06-01' and model_health['holdout_excluded'] is True
+
+    with pytest.raises(ValueError):
+        ForecastingModule(refit_strategy='sometimes')
+
+def test_reuse_falls_back_to_warm_start_when_holdout_is_missed(sample_time_series_df, monkeypatch):
+    """A backtest model that missed the holdout months is not reused: the full series is refit warm."""
+    from aiml_engine.core import forecasting
+
+    monkeypatch.setattr(forecasting, "REUSE_MAX_HOLDOUT_MAPE", 0.0)
+    inits = []
+    original_train = ForecastingModule._train_prophet
+    monkeypatch.setattr(ForecastingModule, "_train_prophet",
+                        lambda self, train_df, init=None: inits.append((len(train_df), init is not None))
+                        or original_train(self, train_df, init))
+
+    forecaster = ForecastingModule(metric='revenue', forecast_horizon=3, use_cache=False, refit_strategy='reuse',
+                                    tiered=False)
+    _, model_health = forecaster.generate_forecast(sample_time_series_df)
+
+    assert inits == [(30, False), (36, True)]
+    assert model_health['refit_strategy'] == 'warm_start'
+    assert model_health['trained_through'] == '2024-12-01' and model_health['holdout_excluded'] is False
+
+def test_warm_start_strategy_initializes_final_fit(sample_time_series_df, monkeypatch):
+    """'warm_start' refits on the full series from the backtest fit's parameters."""
+    inits = []
+    original_train = ForecastingModule._train_prophet
+    monkeypatch.setattr(ForecastingModule, "_train_prophet",
+                        lambda self, train_df, init=None: inits.append(init) or original_train(self, train_df, init))
+
+    forecaster = ForecastingModule(metric='revenue', forecast_horizon=3, use_cache=False, refit_strategy='warm_start',
+                                    tiered=False)
+    forecast, model_health = forecaster.generate_forecast(sample_time_series_df)
+
+    assert len(inits) == 2
+    assert inits[0] is None and inits[1] is not None
+    assert set(inits[1]) >= {'k', 'm', 'sigma_obs'}
+    assert model_health['refit_strategy'] == 'warm_start'
+    assert [point['date'] for point in forecast] == ['2025-01-01', '2025-02-01', '2025-03-01']
+
+def test_warm_start_falls_back_to_cold_refit(sample_time_series_df, monkeypatch):
+    """A warm-started fit worse than the allowed RMSE ratio is redone cold and reported as 'refit'."""
+    from aiml_engine.core import forecasting
+
+    monkeypatch.setattr(forecasting, "WARM_START_MAX_RMSE_RATIO", 0)
+    inits = []
+    original_train = ForecastingModule._train_prophet
+    monkeypatch.setattr(ForecastingModule, "_train_prophet",
+                        lambda self, train_df, init=None: inits.append(init) or original_train(self, train_df, init))
+
+    forecaster = ForecastingModule(metric='revenue', forecast_horizon=3, use_cache=False, refit_strategy='warm_start',
+                                    tiered=False)
+    _, model_health = forecaster.generate_forecast(sample_time_series_df)
+
+    assert [init is None for init in inits] == [True, False, True]
+    assert model_health['refit_strategy'] == 'refit'
+
+def test_smooth_series_is_served_by_baseline_tier(monkeypatch):
+    """A smooth seasonal series is forecast by a fast baseline without fitting Prophet."""
+    t = np.arange(48)
+    df = pd.DataFrame({
+        'date': pd.date_range(start="2021-01-01", periods=48, freq='MS'),
+        'revenue': 1000 + 12 * t + 80 * np.sin(2 * np.pi * t / 12),
+    })
+    monkeypatch.setattr(ForecastingModule, "_train_prophet", lambda *args, **kwargs: pytest.fail("Prophet was fitted"))
+
+    forecast, model_health = ForecastingModule(use_cache=False, tiered=True).generate_forecast(df)
+
+    assert model_health['model_tier'] == 'baseline'
+    assert model_health['best_model_selected'] in ('SeasonalNaive', 'HoltWinters', 'Theta', 'LinearSeasonal')
+    assert model_health['accuracy_percentage'] >= 90
+    assert set(model_health['tier_timings_ms']) == {'baseline', 'final_fit'}
+    assert model_health['backtesting_rmse']['Prophet'] is None
+    assert all(point['lower'] <= point['predicted'] <= point['upper'] for point in forecast)
+    assert [point['date'] for point in forecast] == ['2025-01-01', '2025-02-01', '2025-03-01']
+
+def test_batch_forecast_matches_single_series_batches():
+    """Vectorized batch results equal forecasting each series alone; short series fail gracefully."""
+    rng = np.random.default_rng(3)
+    frames = []
+    for index in range(6):
+        t = np.arange(36)
+        frames.append(pd.DataFrame({
+            'date': pd.date_range(start="2022-01-01", periods=36, freq='MS'),
+            'region': f'R{index}',
+            'revenue': 500 + rng.uniform(0, 15) * t + rng.uniform(0, 80) * np.sin(2 * np.pi * t / 12) + rng.normal(0, 10, 36),
+        }))
+    frames.append(pd.DataFrame({'date': pd.date_range(start="2024-06-01", periods=6, freq='MS'), 'region': 'New', 'revenue': 1.0}))
+    long_df = pd.concat(frames).sample(frac=1, random_state=0)
+
+    forecaster = ForecastingModule(metric='revenue', forecast_horizon=3)
+    forecasts, model_health = forecaster.generate_batch_forecast(long_df, 'region')
+
+    assert model_health['New']['status'] == 'Failed'
+    for region in ('R0', 'R3'):
+        single_forecast, single_health = forecaster.generate_batch_forecast(long_df[long_df['region'] == region], 'region')
+        assert model_health[region]['status'] == 'Success'
+        assert model_health[region]['batch_size'] == 6
+        assert model_health[region]['best_model_selected'] == single_health[region]['best_model_selected']
+        assert [point['date'] for point in forecasts[region]] == ['2025-01-01', '2025-02-01', '2025-03-01']
+        np.testing.assert_allclose([point['predicted'] for point in forecasts[region]],
+                                   [point['predicted'] for point in single_forecast[region]], rtol=1e-9)
+
+
+def test_composite_metric_is_derived_from_component_forecasts():
+    """Ratios come from the component predictions; intervals follow the delta method."""
+    dates = ['2025-01-01', '2025-02-01', '2025-03-01']
+    revenue = [{"date": d, "predicted": 200.0, "lower": 200.0 - 1.96 * 10, "upper": 200.0 + 1.96 * 10} for d in dates]
+    expenses = [{"date": d, "predicted": 150.0, "lower": 150.0 - 1.96 * 5, "upper": 150.0 + 1.96 * 5} for d in dates]
+    dso = [{"date": d, "predicted": 40.0, "lower": 40.0 - 1.96 * 3, "upper": 40.0 + 1.96 * 3} for d in dates]
+    dpo = [{"date": d, "predicted": 30.0, "lower": 30.0 - 1.96 * 4, "upper": 30.0 + 1.96 * 4} for d in dates]
+    forecasts = {'revenue': revenue, 'expenses': expenses, 'dso': dso, 'dpo': dpo}
+
+    ratio, health = ForecastingModule(metric='expense_ratio').derive_forecast(forecasts)
+    assert health['status'] == 'Success' and health['model_tier'] == 'derived'
+    assert [point['date'] for point in ratio] == dates
+    # d(e/r) = de/r - e dr/r^2  ->  sigma^2 = (5/200)^2 + (150*10/200^2)^2
+    sigma = np.sqrt((5 / 200) ** 2 + (150 * 10 / 200 ** 2) ** 2)
+    assert ratio[0]['predicted'] == pytest.approx(0.75)
+    assert ratio[0]['upper'] - ratio[0]['predicted'] == pytest.approx(1.96 * sigma, rel=1e-4)
+
+    cycle, _ = ForecastingModule(metric='cash_conversion_cycle').derive_forecast(forecasts)
+    assert cycle[0]['predicted'] == pytest.approx(10.0)
+    assert cycle[0]['upper'] - cycle[0]['predicted'] == pytest.approx(1.96 * 5.0, rel=1e-4)
+
+    available = ['revenue', 'expenses', 'dso', 'dpo']
+    assert ForecastingModule(metric='expense_ratio').derives_from(available)
+    assert not ForecastingModule(metric='expense_ratio', derive_composites=False).derives_from(available)
+    assert not ForecastingModule(metric='working_capital').derives_from(available)
+
+
+def test_hierarchical_forecast_is_coherent():
+    """Regions and departments add up to the total; top-down keeps a given total forecast."""
+    rng = np.random.default_rng(5)
+    dates = pd.date_range('2021-01-01', periods=36, freq='MS')
+    frames = []
+    for region, department, level in [('North', 'Ops', 300), ('North', 'Sales', 500), ('South', 'Ops', 200)]:
+        t = np.arange(36)
+        frames.append(pd.DataFrame({
+            'date': dates, 'region': region, 'department': department,
+            'revenue': level * (1 + 0.01 * t) + 0.05 * level * rng.standard_normal(36),
+        }))
+    df = pd.concat(frames, ignore_index=True)
+
+    def predictions(points):
+        return np.array([point['predicted'] for point in points])
+
+    for method in ('bottom_up', 'mint'):
+        forecasts, health = ForecastingModule().generate_hierarchical_forecast(df, ['region', 'department'], method=method)
+        total = predictions(forecasts['total'])
+        for column in ('region', 'department'):
+            np.testing.assert_allclose(sum(predictions(f) for f in forecasts[column].values()), total)
+        assert health['region']['North']['reconciliation'] == method
+
+    total_forecast = [{"date": date.strftime('%Y-%m-%d'), "predicted": 1200.0, "lower": 1100.0, "upper": 1300.0}
+                      for date in pd.date_range('2024-01-01', periods=3, freq='MS')]
+    forecasts, _ = ForecastingModule().generate_hierarchical_forecast(df, ['region'], method='top_down',
+                                                                      total_forecast=total_forecast)
+    assert predictions(forecasts['total']).tolist() == [1200.0] * 3
+    assert sum(predictions(f) for f in forecasts['region'].values()).tolist() == pytest.approx([1200.0] * 3)
@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aiml_engine.core.frame_handoff import load_frame, published_frame
+
+
+def _segment_total(frame, region):
+    return float(load_frame(frame, columns=['revenue'], where=('region', region))['revenue'].sum())
+
+
+def test_published_frame_is_read_selectively_and_removed():
+    """Workers get only the requested columns/rows; the shared file is gone after the block."""
+    df = pd.DataFrame({
+        'date': pd.date_range('2022-01-01', periods=8, freq='MS'),
+        'region': pd.Categorical(['North', 'South'] * 4),
+        'revenue': np.arange(8, dtype=float),
+        'notes': ['x'] * 8,
+    })
+    with published_frame(df) as frame:
+        assert frame.path is not None and os.path.exists(frame.path)
+        pd.testing.assert_frame_equal(load_frame(frame), df)
+
+        south = load_frame(frame, columns=['date', 'revenue'], where=('region', 'South'))
+        assert list(south.columns) == ['date', 'revenue']
+        assert south['revenue'].tolist() == [1.0, 3.0, 5.0, 7.0]
+
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            totals = list(executor.map(_segment_total, [frame, frame], ['North', 'South']))
+        assert totals == [12.0, 16.0]
+
+    assert not os.path.exists(frame.path)
+
+
+def test_unwritable_handoff_falls_back_to_json(monkeypatch, tmp_path):
+    """A write failure (e.g. a full /dev/shm) leaves no partial file and hands the frame off as JSON."""
+    from aiml_engine.core import frame_handoff
+
+    def fail_write(df, sink, **kwargs):
+        sink.write(b"ARROW1")
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setenv("FRAME_HANDOFF_DIR", str(tmp_path))
+    monkeypatch.setattr(frame_handoff.feather, "write_feather", fail_write)
+    df = pd.DataFrame({'date': pd.date_range('2022-01-01', periods=3, freq='MS'), 'revenue': [1.0, 2.0, 3.0]})
+
+    with published_frame(df) as frame:
+        assert frame.path is None and frame.payload_json is not None
+        assert load_frame(frame, columns=['revenue'])['revenue'].tolist() == [1.0, 2.0, 3.0]
+    assert list(tmp_path.iterdir()) == []
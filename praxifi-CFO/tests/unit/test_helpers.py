@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from aiml_engine.utils.helpers import drop_duplicate_periods, merge_sorted_frames
+
+
+def test_merge_sorted_frames_is_stable_and_sorted():
+    """Sorted frames merge chronologically; equal dates keep file order so keep='last' wins."""
+    first = pd.DataFrame({'date': pd.to_datetime(['2024-01-01', '2024-03-01', '2024-05-01']), 'source': 1})
+    second = pd.DataFrame({'date': pd.to_datetime(['2024-02-01', '2024-03-01']), 'source': 2})
+    third = pd.DataFrame({'date': pd.to_datetime(['2024-03-01', '2024-06-01']), 'source': 3})
+
+    merged = merge_sorted_frames([first, second, third])
+
+    assert merged['date'].is_monotonic_increasing
+    assert merged.loc[merged['date'] == '2024-03-01', 'source'].tolist() == [1, 2, 3]
+    deduped = merged.drop_duplicates(subset=['date'], keep='last')
+    assert deduped.loc[deduped['date'] == '2024-03-01', 'source'].item() == 3
+
+    expected = pd.concat([first, second, third], ignore_index=True).sort_values('date', kind='stable')
+    assert np.array_equal(merged['source'].to_numpy(), expected['source'].to_numpy())
+
+
+def test_drop_duplicate_periods_keeps_one_row_per_date_and_segment():
+    """Repeated periods are deduplicated within each region/department, never across them."""
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-01'] * 4 + ['2024-02-01'] * 2),
+        'region': ['East', 'West', 'East', 'East', 'East', 'West'],
+        'department': ['Ops', 'Ops', 'Ops', 'Sales', 'Ops', 'Ops'],
+        'source': [1, 1, 2, 1, 1, 1],
+    })
+
+    deduped = drop_duplicate_periods(df)
+
+    assert len(deduped) == 5
+    east_ops = deduped[(deduped['region'] == 'East') & (deduped['department'] == 'Ops')]
+    assert east_ops['source'].tolist() == [2, 1]
+    # Placeholder segment columns (all empty) do not split periods
+    unsegmented = df.assign(region=None, department=None)
+    assert drop_duplicate_periods(unsegmented)['source'].tolist() == [1, 1]
+